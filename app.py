@@ -2,19 +2,107 @@
 """
 Micro-site: serves a QR code that links to a Gumroad product.
 """
-from flask import Flask, send_file
-import qrcode, io, os
+from flask import Flask, Response, request, jsonify, abort
+from collections import OrderedDict
+import os, hashlib, threading
+import qr_engine
+from http_cache import etag_match
 
 app = Flask(__name__)
 
+URL = "https://gum.co/tip-001"
+
+# ---------- render once ----------
+# the target never changes, so the PNG is built at import and every hit
+# is served from memory; revalidations with a matching ETag get a bare 304
+QR_PNG  = qr_engine.render(URL)
+QR_ETAG = '"' + hashlib.sha256(QR_PNG).hexdigest()[:32] + '"'
+QR_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
 @app.route("/")
 def qr():
-    url = "https://gum.co/tip-001"
-    img = qrcode.make(url)
-    buf = io.BytesIO()
-    img.save(buf, "PNG")
-    buf.seek(0)
-    return send_file(buf, mimetype="image/png")
+    headers = {"ETag": QR_ETAG, "Cache-Control": QR_CACHE_CONTROL}
+    if etag_match(request.headers.get("If-None-Match"), QR_ETAG):
+        return Response(status=304, headers=headers)
+    return Response(QR_PNG, mimetype="image/png", headers=headers)
+
+# ---------- parameterised render cache ----------
+# /qr?url=&size=&ec=&fmt= lets one deployment draw QR codes for any slug;
+# renders live in a byte-budgeted LRU so memory stays flat however many
+# distinct targets come through, and hot slugs are never re-rendered
+EC_LEVELS = qr_engine.EC_LEVELS
+FORMATS   = qr_engine.MIMETYPES
+MAX_URL   = 512
+
+class RenderCache:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._d.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._d.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, entry):
+        size = len(entry[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._d.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[0])
+            self._d[key] = entry
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (body, _) = self._d.popitem(last=False)
+                self.bytes -= len(body)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._d), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+CACHE = RenderCache(int(os.environ.get("QR_CACHE_BYTES", 32 * 1024 * 1024)))
+
+@app.route("/qr")
+def qr_any():
+    url = request.args.get("url", URL)
+    fmt = request.args.get("fmt", "png").lower()
+    ec  = request.args.get("ec", "M").upper()
+    try:
+        size = int(request.args.get("size", 10))
+    except ValueError:
+        abort(400, "size must be an integer")
+    if not url.startswith(("http://", "https://")) or len(url) > MAX_URL:
+        abort(400, "url must be http(s) and at most %d chars" % MAX_URL)
+    if not 1 <= size <= 40 or ec not in EC_LEVELS or fmt not in FORMATS:
+        abort(400, "size 1-40, ec L/M/Q/H, fmt png/svg")
+
+    key = (url, size, ec, fmt)
+    entry = CACHE.get(key)
+    if entry is None:
+        body = qr_engine.render(url, fmt, box=size, ec=ec)
+        entry = (body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"')
+        CACHE.put(key, entry)
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": QR_CACHE_CONTROL}
+    if etag_match(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype=FORMATS[fmt], headers=headers)
+
+@app.route("/qr/stats")
+def qr_stats():
+    return jsonify(CACHE.stats())
 
 @app.route("/health")
 def health():
@@ -22,4 +110,4 @@ def health():
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
-    app.run(host="0.0.0.0", port=port)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port)
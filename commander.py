@@ -2,91 +2,602 @@
 """
 commander.py  –  live swarm dashboard + instant spawn
 """
-import json, os, time, threading, pathlib, httpx, subprocess, logging
+import json, os, sys, shutil, time, httpx, subprocess, logging, asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from functools import lru_cache
+from html import escape
+from urllib.parse import urlencode
+import base64, bisect, hashlib
 import uvicorn
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sales_store import SalesStore
+import swarm_log
+from swarm_state import StateCache
+from spawn_jobs import JobQueue, QueueFull
+from emergency_spawn import request_spawn, DaemonUnavailable
+from supervisor import Lease, Supervisor
+from revenue_rollups import RevenueRollups
+from http_cache import etag_match
 
 ROOT      = Path(__file__).parent
 STATE_F   = ROOT / "forge_state.json"
 LOG_F     = ROOT / "commander.log"
 GUM_TOKEN = os.getenv("GUMROAD_TOKEN")
+HEALTH_INTERVAL    = float(os.getenv("HEALTH_INTERVAL", 30))
+HEALTH_CONCURRENCY = int(os.getenv("HEALTH_CONCURRENCY", 20))
+GUM_API            = "https://api.gumroad.com/v2"
+GUM_CONCURRENCY    = int(os.getenv("GUM_CONCURRENCY", 8))
+METRICS_TTL        = float(os.getenv("METRICS_TTL", 60))
+METRICS_STALE      = float(os.getenv("METRICS_STALE", 600))   # serve stale this long while refreshing
+SPAWN_WORKERS      = int(os.getenv("SPAWN_WORKERS", 2))
+SPAWN_QUEUE        = int(os.getenv("SPAWN_QUEUE", 16))
+SPAWN_TIMEOUT      = float(os.getenv("SPAWN_TIMEOUT", 300))
+SUPERVISE          = os.getenv("SUPERVISE", "1" if shutil.which("railway") else "0") == "1"
+LEASE_DB           = Path(os.getenv("LEASE_DB", ROOT / "supervisor.db"))
+REDEPLOY_CONCURRENCY = int(os.getenv("REDEPLOY_CONCURRENCY", 2))
 
-logging.basicConfig(filename=LOG_F, level=logging.INFO,
-                    format='%(asctime)s %(message)s')
-
-app = FastAPI(title="SwarmCommander")
+swarm_log.setup(LOG_F)
+log = logging.getLogger("commander")
 
 # ---------- helpers ----------
+STATE = StateCache(STATE_F)
+
 def safe_state():
+    """immutable swarm snapshot; forge_state.json is only re-parsed when it changes"""
+    return STATE.snapshot()
+
+# ---------- prometheus ----------
+# commander's own internals for /metrics/prom (the Gumroad-backed /metrics is separate)
+PROBE_SECONDS  = Histogram("commander_health_probe_seconds", "Funnel health probe latency", ["slug"])
+PROBE_FAILURES = Counter("commander_health_probe_failures_total", "Failed funnel health probes", ["slug"])
+GUM_SECONDS    = Histogram("commander_gumroad_request_seconds", "Gumroad API latency to response headers",
+                           ["status"])
+GUM_ERRORS     = Counter("commander_gumroad_errors_total", "Gumroad API errors", ["kind"])
+SPAWN_SECONDS  = Histogram("commander_spawn_job_seconds", "Spawn job run time", ["status"],
+                           buckets=(1, 5, 10, 30, 60, 120, 300, float("inf")))
+HTTP_SECONDS   = Histogram("commander_http_request_seconds", "Commander request latency",
+                           ["route", "method", "status"])
+
+class CommanderCollector:
+    """values that already live on commander objects, read at scrape time"""
+    def describe(self):
+        yield CounterMetricFamily("commander_state_reloads", "forge_state.json re-parses")
+        yield GaugeMetricFamily("commander_spawn_queue_depth", "Spawn jobs waiting for a worker")
+        yield GaugeMetricFamily("commander_event_subscribers", "Connected /events streams")
+
+    def collect(self):
+        c = CounterMetricFamily("commander_state_reloads", "forge_state.json re-parses")
+        c.add_metric([], STATE.reloads)
+        yield c
+        g = GaugeMetricFamily("commander_spawn_queue_depth", "Spawn jobs waiting for a worker")
+        g.add_metric([], JOBS.depth())
+        yield g
+        g = GaugeMetricFamily("commander_event_subscribers", "Connected /events streams")
+        g.add_metric([], len(EVENTS.subs))
+        yield g
+
+REGISTRY.register(CommanderCollector())
+
+# ---------- live events ----------
+# pollers publish per-slug deltas here and every /events subscriber gets
+# its own bounded queue; watchers never cause extra probes or API calls
+class Broadcaster:
+    def __init__(self, maxsize=256, keepalive=15):
+        self.maxsize = maxsize
+        self.keepalive = keepalive
+        self.subs = set()
+
+    def publish(self, kind, **data):
+        msg = f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+        for q in list(self.subs):
+            if q.full():                       # slow reader: drop its oldest delta
+                q.get_nowait()
+            q.put_nowait(msg)
+
+    async def stream(self):
+        q = asyncio.Queue(self.maxsize)
+        self.subs.add(q)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(q.get(), self.keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            self.subs.discard(q)
+
+EVENTS = Broadcaster()
+
+async def watch_state(poll=1.0):
+    """publish spawn/gone deltas when forge_state.json gains or loses slugs"""
+    known = set(safe_state().by_slug)
+    while True:
+        await asyncio.sleep(poll)
+        snap = safe_state()
+        now = set(snap.by_slug)
+        for slug in now - known:
+            s = snap.get(slug)
+            EVENTS.publish("spawn", slug=slug, railway=s["railway"], gumroad=s["gumroad"])
+        for slug in known - now:
+            EVENTS.publish("gone", slug=slug)
+        known = now
+
+# ---------- background health poller ----------
+# one pooled AsyncClient probes every funnel on an interval with bounded
+# concurrency; the dashboard only ever reads the cached results
+class HealthPoller:
+    def __init__(self, interval, concurrency, timeout=3):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.results = {}     # slug -> {"ok": bool, "checked": epoch, "ms": float}
+        self.version = 0      # bumped after every sweep; part of the dashboard ETag
+
+    async def _probe(self, client, sem, slug, url):
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                ok = (await client.get(url)).is_success
+            except Exception:
+                ok = False
+            PROBE_SECONDS.labels(slug).observe(time.perf_counter() - t0)
+            if not ok:
+                PROBE_FAILURES.labels(slug).inc()
+            prev = self.results.get(slug)
+            self.results[slug] = {"ok": ok, "checked": time.time(),
+                                  "ms": round((time.perf_counter() - t0) * 1000, 1)}
+            if prev is None or prev["ok"] != ok:
+                EVENTS.publish("health", slug=slug, ok=ok, ms=self.results[slug]["ms"])
+
+    async def sweep(self, client):
+        swarm = safe_state().swarm
+        sem = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._probe(client, sem, s["slug"], s["railway"]) for s in swarm))
+        live = {s["slug"] for s in swarm}
+        for slug in list(self.results):
+            if slug not in live:
+                self.results.pop(slug, None)
+        self.version += 1
+
+    async def run(self):
+        limits = httpx.Limits(max_connections=self.concurrency,
+                              max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            while True:
+                try:
+                    await self.sweep(client)
+                except Exception as e:
+                    log.error(f"health sweep failed: {e}")
+                await asyncio.sleep(self.interval)
+
+    def get(self, slug):
+        return self.results.get(slug)
+
+POLLER = HealthPoller(HEALTH_INTERVAL, HEALTH_CONCURRENCY)
+
+def health_badge(slug):
+    r = POLLER.get(slug)
+    if r is None:
+        return "⚪"
+    age = int(time.time() - r["checked"])
+    return f"<span title='{r['ms']} ms, {age}s ago'>{'🟢' if r['ok'] else '🔴'}</span>"
+
+# ---------- gumroad sales sync ----------
+# sales land in the local SQLite warehouse (sales_store); each slug is
+# re-synced incrementally at most every METRICS_TTL, served stale for up to
+# METRICS_STALE while one background sync runs, and concurrent misses for
+# the same slug share a single upstream sync
+class SalesFanout:
+    def __init__(self, store, ttl, stale, concurrency, timeout=10):
+        self.store = store
+        self.ttl = ttl
+        self.stale = stale
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.sem = asyncio.Semaphore(concurrency)
+        self.client = None
+        self.synced = {}      # slug -> (synced_at, error or None)
+        self.inflight = {}    # slug -> asyncio.Task
+
+    def open(self):
+        self.client = httpx.AsyncClient(
+            base_url=GUM_API, timeout=self.timeout,
+            headers={"Authorization": f"Bearer {GUM_TOKEN}"},
+            limits=httpx.Limits(max_connections=self.concurrency),
+            event_hooks={"request": [self._mark], "response": [self._observe]})
+
+    @staticmethod
+    async def _mark(request):
+        request.extensions["t0"] = time.perf_counter()
+
+    @staticmethod
+    async def _observe(response):
+        t0 = response.request.extensions.get("t0")
+        if t0 is not None:
+            GUM_SECONDS.labels(str(response.status_code)).observe(time.perf_counter() - t0)
+        if response.status_code >= 400:
+            GUM_ERRORS.labels(f"http_{response.status_code}").inc()
+
+    async def close(self):
+        if self.client:
+            await self.client.aclose()
+
+    async def _sync(self, slug):
+        async with self.sem:
+            try:
+                if await self.store.sync(self.client, slug):
+                    EVENTS.publish("sales", **(await asyncio.to_thread(self.store.summary, [slug]))[0])
+                err = None
+            except Exception as e:
+                if not isinstance(e, httpx.HTTPStatusError):    # http errors counted by the hook
+                    GUM_ERRORS.labels(type(e).__name__).inc()
+                err = str(e)
+        self.synced[slug] = (time.time(), err)
+        return err
+
+    def _refresh(self, slug):
+        task = self.inflight.get(slug)
+        if task is None:
+            task = self.inflight[slug] = asyncio.create_task(self._sync(slug))
+            task.add_done_callback(lambda _: self.inflight.pop(slug, None))
+        return task
+
+    async def ensure(self, slug):
+        hit = self.synced.get(slug)
+        age = time.time() - hit[0] if hit else None
+        if hit and age < self.ttl:
+            return hit[1]
+        if hit and age < self.ttl + self.stale:
+            self._refresh(slug)
+            return hit[1]
+        return await asyncio.shield(self._refresh(slug))
+
+    async def all(self, slugs):
+        errors = await asyncio.gather(*(self.ensure(s) for s in slugs))
+        data = await asyncio.to_thread(self.store.summary, slugs)
+        for row, err in zip(data, errors):
+            if err:
+                row["error"] = err
+        return data
+
+    async def run(self, slugs):
+        """keep the warehouse warm (and `sales` events flowing) with no /metrics callers"""
+        while True:
+            try:
+                await self.all(slugs())
+            except Exception as e:
+                log.error(f"sales sync failed: {e}")
+            await asyncio.sleep(self.ttl)
+
+SALES = SalesFanout(SalesStore(), METRICS_TTL, METRICS_STALE, GUM_CONCURRENCY)
+ROLLUPS = RevenueRollups(SALES.store)
+
+# ---------- log tail ----------
+# the log is never read whole: pages are found by seeking backwards from
+# EOF (or from a byte cursor) in blocks until enough newlines are seen
+LOG_BLOCK = 64 * 1024
+
+def tail_lines(path, n, before=None):
+    """last n lines ending at byte offset `before` -> (lines, offset of first line)"""
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END) if before is None else max(0, min(before, f.seek(0, os.SEEK_END)))
+        pos, buf = end, b""
+        while pos > 0 and buf.count(b"\n") <= n:
+            step = min(LOG_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+    cut, stop = len(buf), len(buf) - buf.endswith(b"\n")
+    for _ in range(n):
+        cut = buf.rfind(b"\n", 0, stop) + 1
+        if cut == 0:
+            break
+        stop = cut - 1
+    lines = buf[cut:].decode("utf-8", "replace").splitlines() if n else []
+    return lines, pos + cut
+
+async def follow(path, poll=0.5):
+    """SSE events for lines appended after connect; restarts from 0 on truncate/rotate"""
+    pos = path.stat().st_size if path.exists() else 0
+    partial = b""
+    while True:
+        size = path.stat().st_size if path.exists() else 0
+        if size < pos:
+            pos, partial = 0, b""
+        if size > pos:
+            with open(path, "rb") as f:
+                f.seek(pos)
+                chunk = f.read(size - pos)
+            pos = size
+            *done, partial = (partial + chunk).split(b"\n")
+            for line in done:
+                yield f"data: {line.decode('utf-8', 'replace')}\n\n"
+        else:
+            yield ": keepalive\n\n"
+        await asyncio.sleep(poll)
+
+# ---------- spawn jobs ----------
+def run_spawn():
+    """ask the warm spawn daemon; cold-start emergency_spawn.py only if none is listening"""
+    t0, status = time.perf_counter(), "failed"
+    try:
+        try:
+            spawned = request_spawn(1, timeout=SPAWN_TIMEOUT)
+            result = " ".join(f"✅ spawned {p['gumroad']}" for p in spawned)
+        except DaemonUnavailable:
+            p = subprocess.run([sys.executable, "emergency_spawn.py"], cwd=ROOT,
+                               capture_output=True, text=True, timeout=SPAWN_TIMEOUT)
+            if p.returncode:
+                raise RuntimeError((p.stderr or p.stdout).strip()[-500:] or f"exit {p.returncode}")
+            result = p.stdout.strip().splitlines()[-1] if p.stdout.strip() else "ok"
+        status = "done"
+        return result
+    finally:
+        SPAWN_SECONDS.labels(status).observe(time.perf_counter() - t0)
+
+JOBS = JobQueue(run_spawn, workers=SPAWN_WORKERS, maxsize=SPAWN_QUEUE)
+
+# ---------- redeploy supervisor ----------
+def supervisor():
+    return Supervisor(POLLER.get, lambda: safe_state().slugs(),
+                      Lease(LEASE_DB, ttl=3 * HEALTH_INTERVAL),
+                      interval=HEALTH_INTERVAL, concurrency=REDEPLOY_CONCURRENCY)
+
+@asynccontextmanager
+async def lifespan(app):
+    tasks = [asyncio.create_task(POLLER.run()), asyncio.create_task(watch_state())]
+    if GUM_TOKEN:                                  # no token: nothing to sync, /metrics says so
+        SALES.open()
+        tasks.append(asyncio.create_task(SALES.run(lambda: safe_state().slugs())))
+    if SUPERVISE:
+        tasks.append(asyncio.create_task(supervisor().run()))
+    yield
+    for t in tasks:
+        t.cancel()
+    await SALES.close()
+
+app = FastAPI(title="SwarmCommander", lifespan=lifespan)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@app.middleware("http")
+async def time_requests(request, call_next):
+    t0 = time.perf_counter()
+    status = 500
     try:
-        return json.loads(STATE_F.read_text()) if STATE_F.exists() else {"swarm": []}
-    except Exception as e:
-        logging.error(f"malformed json: {e}")
-        return {"swarm": []}
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_SECONDS.labels(route.path if route else "unmatched", request.method,
+                            str(status)).observe(time.perf_counter() - t0)
+
+# ---------- fleet table ----------
+# rows are filtered + sorted once per (state, health sweep, sales version,
+# query) and kept in a small LRU; pages are cut from that list by keyset
+# cursor with bisect, so a 10k-funnel fleet costs a slice per request
+PAGE_DEFAULT, PAGE_MAX = 100, 1000
+HEALTH_RANK = {True: 2, None: 1, False: 0}
+SORT_KEYS = {
+    "slug":    lambda r: (r["slug"],),
+    "health":  lambda r: (HEALTH_RANK[r["ok"]], r["slug"]),
+    "revenue": lambda r: (r["revenue"], r["slug"]),
+    "sales":   lambda r: (r["sales"], r["slug"]),
+}
+
+@lru_cache(maxsize=64)
+def _sorted_rows(state_sig, health_v, sales_v, q, health, sort, min_revenue=0):
+    totals = SALES.store.totals()
+    rows = []
+    for s in safe_state():
+        if q and q not in s["slug"].lower():
+            continue
+        h = POLLER.get(s["slug"])
+        ok = h["ok"] if h else None
+        if health and {"up": True, "down": False, "unknown": None}.get(health, ok) is not ok:
+            continue
+        n, rev = totals.get(s["slug"], (0, 0))
+        if rev < min_revenue:
+            continue
+        rows.append({"slug": s["slug"], "railway": s["railway"], "gumroad": s["gumroad"],
+                     "ok": ok, "ms": h["ms"] if h else None,
+                     "checked": h["checked"] if h else None, "sales": n, "revenue": rev})
+    rows.sort(key=SORT_KEYS[sort])
+    return rows
+
+def _encode_cursor(sort, key):
+    return base64.urlsafe_b64encode(json.dumps([sort, *key]).encode()).decode().rstrip("=")
 
-def health(url, timeout=3):
+def _decode_cursor(cursor, sort, like):
+    """-> key tuple, or None when the cursor belongs to another sort or has the wrong shape"""
     try:
-        return httpx.get(url, timeout=timeout).is_success
+        name, *key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
     except Exception:
-        return False
+        return None
+    if name != sort or [type(k) for k in key] != [type(k) for k in like]:
+        return None
+    return tuple(key)
 
-# ---------- routes ----------
-@app.get("/", response_class=HTMLResponse)
-def dashboard():
-    st = safe_state()
-    rows = "\n".join(
-        f"<tr><td>{s['slug']}</td>"
-        f"<td><a href='{s['railway']}'>Railway</a></td>"
-        f"<td><a href='{s['gumroad']}'>Gumroad</a></td>"
-        f"<td>{'🟢' if health(s['railway']) else '🔴'}</td></tr>"
-        for s in st.get("swarm", [])
-    )
-    html = f"""
+def fleet_page(q="", health="", sort="slug", desc=False, cursor=None, limit=PAGE_DEFAULT,
+               min_revenue=0):
+    """-> (page rows, next cursor or None, total matching)"""
+    sort = sort if sort in SORT_KEYS else "slug"
+    limit = max(1, min(limit, PAGE_MAX))
+    rows = _sorted_rows(safe_state().sig, POLLER.version, SALES.store.version,
+                        q.lower(), health, sort, min_revenue)
+    kf = SORT_KEYS[sort]
+    cur = _decode_cursor(cursor, sort, kf(rows[0])) if cursor and rows else None
+    if not desc:
+        i = bisect.bisect_right(rows, cur, key=kf) if cur else 0
+        page, more = rows[i:i + limit], i + limit < len(rows)
+    else:
+        i = bisect.bisect_left(rows, cur, key=kf) if cur else len(rows)
+        page, more = rows[max(0, i - limit):i][::-1], i - limit > 0
+    nxt = _encode_cursor(sort, kf(page[-1])) if page and more else None
+    return page, nxt, len(rows)
+
+def fleet_etag(request):
+    raw = f"{safe_state().sig}|{POLLER.version}|{SALES.store.version}|{request.url.path}|{request.url.query}"
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+def not_modified(request, etag):
+    return etag_match(request.headers.get("if-none-match"), etag)
+
+LIVE_JS = """<script>
+const es = new EventSource("/events"), row = s => document.querySelector(`tr[data-slug="${CSS.escape(s)}"]`);
+const note = t => document.getElementById("live").textContent = t;
+es.addEventListener("health", e => { const d = JSON.parse(e.data), r = row(d.slug);
+  if (r) r.querySelector(".h").textContent = d.ok ? "🟢" : "🔴"; });
+es.addEventListener("sales", e => { const d = JSON.parse(e.data), r = row(d.slug);
+  if (r) { r.querySelector(".n").textContent = d.sales; r.querySelector(".r").textContent = d.revenue; } });
+es.addEventListener("spawn", e => note(`🚀 new funnel ${JSON.parse(e.data).slug} – reload to see it`));
+es.addEventListener("gone", e => { const r = row(JSON.parse(e.data).slug); if (r) r.remove(); });
+</script>"""
+
+def _html_chunks(page, nxt, total, params):
+    qs = lambda **kw: escape("?" + urlencode({k: int(v) if isinstance(v, bool) else v
+                                              for k, v in {**params, **kw}.items()
+                                              if v not in ("", None, False, 0)}))
+    sort_link = lambda col, label: (f"<a href='{qs(sort=col, desc=int(params['sort'] == col and not params['desc']), cursor=None)}'>"
+                                    f"{label}</a>")
+    yield f"""
     <h1>🧬 Live Swarm</h1>
+    <form method="get">
+      <input name="q" value="{escape(params['q'])}" placeholder="slug filter">
+      <select name="health">{"".join(f"<option{' selected' if params['health'] == v else ''}>{v}</option>"
+                                      for v in ("", "up", "down", "unknown"))}</select>
+      <input name="min_revenue" type="number" min="0" value="{params['min_revenue'] or ''}" placeholder="min revenue">
+      <button>filter</button> {total} funnels
+    </form>
     <table border=1>
-    <tr><th>Slug</th><th>Railway</th><th>Gumroad</th><th>Health</th></tr>
-    {rows or "<tr><td colspan=4>🌱 No funnels yet</td></tr>"}
+    <tr><th>{sort_link("slug", "Slug")}</th><th>Railway</th><th>Gumroad</th>
+        <th>{sort_link("health", "Health")}</th><th>{sort_link("sales", "Sales")}</th>
+        <th>{sort_link("revenue", "Revenue")}</th></tr>
+    """
+    if not page:
+        yield "<tr><td colspan=6>🌱 No funnels yet</td></tr>"
+    for i in range(0, len(page), 200):
+        yield "\n".join(
+            f"<tr data-slug='{escape(r['slug'])}'><td>{escape(r['slug'])}</td>"
+            f"<td><a href='{escape(r['railway'])}'>Railway</a></td>"
+            f"<td><a href='{escape(r['gumroad'])}'>Gumroad</a></td>"
+            f"<td class=h>{health_badge(r['slug'])}</td><td class=n>{r['sales']}</td>"
+            f"<td class=r>{r['revenue']}</td></tr>"
+            for r in page[i:i + 200])
+    pager = f"<a href='{qs(cursor=None)}'>first</a>"
+    if nxt:
+        pager += f" | <a href='{qs(cursor=nxt)}'>next →</a>"
+    yield f"""
     </table>
+    <p>{pager}</p>
     <form action="/make-one" method="post">
         <button type="submit">🚀 Spawn New Product</button>
     </form>
-    <p><a href="/logs">logs</a> | <a href="/metrics">metrics</a></p>
+    <p><a href="/logs">logs</a> | <a href="/metrics">metrics</a> | <a href="/api/funnels">json</a></p>
+    <p id=live></p>
+    {LIVE_JS}
     """
-    return html
+
+# ---------- routes ----------
+@app.get("/", response_class=HTMLResponse)
+def dashboard(request: Request, q: str = "", health: str = "", sort: str = "slug",
+              desc: bool = False, cursor: str | None = None, limit: int = PAGE_DEFAULT,
+              min_revenue: int = 0):
+    etag = fleet_etag(request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    page, nxt, total = fleet_page(q, health, sort, desc, cursor, limit, min_revenue)
+    params = {"q": q, "health": health, "sort": sort, "desc": desc, "limit": limit,
+              "min_revenue": min_revenue}
+    return StreamingResponse(_html_chunks(page, nxt, total, params),
+                             media_type="text/html; charset=utf-8", headers=headers)
+
+@app.get("/api/funnels")
+def funnels(request: Request, q: str = "", health: str = "", sort: str = "slug",
+            desc: bool = False, cursor: str | None = None, limit: int = PAGE_DEFAULT,
+            min_revenue: int = 0):
+    etag = fleet_etag(request)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    page, nxt, total = fleet_page(q, health, sort, desc, cursor, limit, min_revenue)
+    return JSONResponse({"items": page, "next": nxt, "total": total}, headers=headers)
+
+@app.get("/events")
+def events():
+    return StreamingResponse(EVENTS.stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.post("/make-one")
-def spawn_one():
-    """webhook to trigger emergency_spawn.py"""
+def spawn_one(request: Request, key: str | None = None):
+    """webhook to queue an emergency_spawn.py run; Idempotency-Key dedupes retries"""
+    key = request.headers.get("idempotency-key") or key
     try:
-        subprocess.Popen(["python", "emergency_spawn.py"], cwd=ROOT)
-        return {"status": "spawn queued"}
-    except Exception as e:
-        logging.error(f"spawn failed: {e}")
-        return {"status": "spawn error", "detail": str(e)}
+        job, created = JOBS.submit(key=key)
+    except QueueFull as e:
+        log.error(f"spawn rejected: {e}")
+        return JSONResponse({"status": "spawn queue full", "detail": str(e)},
+                            status_code=429, headers={"Retry-After": "30"})
+    return JSONResponse({"status": "spawn queued" if created else "spawn deduped",
+                         "job": job["id"], "href": f"/jobs/{job['id']}"},
+                        status_code=202 if created else 200)
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "unknown job"}, status_code=404)
+    return job
+
+@app.get("/metrics/series")
+def metrics_series(slug: str | None = None, res: str = "day", ma: int = 7, last: int | None = None):
+    """daily/hourly revenue + sales for one slug or the whole fleet (no slug)"""
+    if res not in ROLLUPS.res:
+        return JSONResponse({"error": "res must be day or hour"}, status_code=400)
+    return ROLLUPS.series(slug, res, ma, last)
+
+@app.get("/metrics/movers")
+def metrics_movers(res: str = "day", window: int = 7, n: int = 10):
+    if res not in ROLLUPS.res:
+        return JSONResponse({"error": "res must be day or hour"}, status_code=400)
+    return ROLLUPS.movers(res, max(1, window), max(1, min(n, 500)))
+
+@app.get("/metrics/prom")
+def metrics_prom():
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/logs")
-def logs():
-    return HTMLResponse(f"<pre>{LOG_F.read_text() if LOG_F.exists() else 'No logs'}</pre>")
+def logs(n: int = 200, before: int | None = None, format: str = "html"):
+    """last n lines; `before` is the byte cursor returned by the previous page"""
+    n = max(0, min(n, 5000))
+    lines, cursor = tail_lines(LOG_F, n, before) if LOG_F.exists() else ([], 0)
+    if format == "json":
+        return {"lines": lines, "before": cursor or None}
+    older = f"<a href='/logs?n={n}&before={cursor}'>older</a> | " if cursor else ""
+    return HTMLResponse(
+        f"<p>{older}<a href='/logs/stream'>live tail</a></p>"
+        f"<pre>{escape(chr(10).join(lines)) if lines else 'No logs'}</pre>")
+
+@app.get("/logs/stream")
+def logs_stream():
+    return StreamingResponse(follow(LOG_F), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
 
 @app.get("/metrics")
-def metrics():
+async def metrics():
     if not GUM_TOKEN:
         return {"error": "no GUMROAD_TOKEN"}
-    data = []
-    for p in safe_state().get("swarm", []):
-        slug = p["slug"]
-        try:
-            r = httpx.get(f"https://api.gumroad.com/v2/products/{slug}/sales",
-                          headers={"Authorization": f"Bearer {GUM_TOKEN}"})
-            sales = r.json().get("sales", [])
-            rev = sum(int(s["variants"][0]["price"]) for s in sales)
-            data.append({"slug": slug, "sales": len(sales), "revenue": rev})
-        except Exception as e:
-            data.append({"slug": slug, "sales": 0, "revenue": 0, "error": str(e)})
-    return data
+    return await SALES.all(safe_state().slugs())
 
 # ---------- start ----------
 if __name__ == "__main__":
-    uvicorn.run("commander:app", host="0.0.0.0", port=7777)
\ No newline at end of file
+    # pass the app object: an import string would load this module a second
+    # time and register every prometheus metric twice
+    uvicorn.run(app, host="0.0.0.0", port=7777)
\ No newline at end of file
@@ -1,49 +1,53 @@
 #!/usr/bin/env python3
 """
 emergency_spawn.py – auto-create a Gumroad product + Railway service
+python emergency_spawn.py                       # one product
+python emergency_spawn.py --count 20 -c 5 -r 2  # 20 products, 5 in flight, ≤2 req/s
+
+Thin client: asks the warm spawn_daemon over its Unix socket and only
+imports the spawner (and runs it in-process) when no daemon answers.
 """
-import json, os, subprocess, uuid, pathlib, datetime
+import json, os, socket
 from pathlib import Path
 
-ROOT   = Path(__file__).parent
-STATE  = ROOT / "forge_state.json"
-TOKEN  = os.getenv("GUMROAD_TOKEN")
-if not TOKEN:
-    raise RuntimeError("Set GUMROAD_TOKEN")
-
-def safe_state():
-    return json.loads(STATE.read_text()) if STATE.exists() else {"swarm": []}
+ROOT = Path(__file__).parent
+SOCK = Path(os.getenv("SPAWN_SOCK", ROOT / "spawn.sock"))
 
-def save_state(obj):
-    STATE.write_text(json.dumps(obj, indent=2))
+class DaemonUnavailable(Exception):
+    pass
 
-def create_product():
-    slug  = f"ai-product-{uuid.uuid4().hex[:6]}"
-    title = f"AI Income Stream #{datetime.datetime.utcnow().strftime('%m%d')}"
-    price = 9
-    body  = "Fully automated passive-income asset generated while you sleep."
+def request_spawn(count=1, path=SOCK, timeout=300):
+    """-> list of spawned swarm entries; raises DaemonUnavailable / RuntimeError"""
+    try:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        s.settimeout(timeout)
+        s.connect(str(path))
+    except (OSError, AttributeError) as e:        # no socket file / no AF_UNIX on windows
+        raise DaemonUnavailable(str(e))
+    with s, s.makefile("rwb") as f:
+        f.write(json.dumps({"count": count}).encode() + b"\n")
+        f.flush()
+        resp = json.loads(f.readline() or b"{}")
+    if not resp.get("ok"):
+        raise RuntimeError(resp.get("error", "spawn daemon returned nothing"))
+    return resp["spawned"]
 
-    cmd = [
-        "curl", "-s", "-X", "POST",
-        "https://api.gumroad.com/v2/products",
-        "-H", f"Authorization: Bearer {TOKEN}",
-        "-F", f"name={title}",
-        "-F", f"url={slug}",
-        "-F", f"price={price}",
-        "-F", f"description={body}",
-        "-F", "file=@dummy.pdf"
-    ]
-    proc = subprocess.run(cmd, capture_output=True, text=True)
-    return json.loads(proc.stdout)
+def spawn(count=1, concurrency=4, rate=2.0):
+    try:
+        return request_spawn(count)
+    except DaemonUnavailable:
+        import asyncio, spawn_daemon
+        return asyncio.run(spawn_daemon.spawn_batch(count, concurrency, rate))
 
 if __name__ == "__main__":
-    state = safe_state()
-    prod  = create_product()
-    slug  = prod["product"]["url"]
-    state["swarm"].append({
-        "slug": slug,
-        "railway": f"https://{slug}.up.railway.app",
-        "gumroad": f"https://gum.co/{slug}"
-    })
-    save_state(state)
-    print(f"✅ spawned https://gum.co/{slug}")
\ No newline at end of file
+    import argparse, sys
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--count", "-n", type=int, default=1)
+    ap.add_argument("--concurrency", "-c", type=int, default=4)
+    ap.add_argument("--rate", "-r", type=float, default=2.0, help="max requests/sec")
+    args = ap.parse_args()
+    spawned = spawn(args.count, args.concurrency, args.rate)
+    for p in spawned:
+        print(f"✅ spawned {p['gumroad']}")
+    if not spawned:
+        sys.exit(1)
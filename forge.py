@@ -1,18 +1,31 @@
 #!/usr/bin/env python3
 """
 forge.py  –  Infinite AI-Product Forge
-python forge.py --bootstrap   # run forever
+python forge.py --bootstrap [--count 5]   # run forever, 5 products per hourly wave
+python forge.py --spawn-once [--count 5]
 """
-import os, json, time, uuid, textwrap, zipfile, io, subprocess, pathlib, httpx, openai
+import os, re, json, time, zipfile, pathlib, threading, asyncio, httpx, openai
+import logging
+import landing_bundle, swarm_log, image_pipeline
+from llm_cache import CACHE
+from swarm_state import JOURNAL, STATE     # spawns append to the journal, never rewrite forge_state.json
 from pathlib import Path
 
 # ---------- CONFIG ----------
-STATE_FILE   = Path("forge_state.json")
 OPENAI_KEY   = os.getenv("OPENROUTER_KEY") or os.getenv("OPENAI_API_KEY")
 HEADERS      = {"Authorization": f"Bearer {OPENAI_KEY}", "HTTP-Referer": "https://income-lab.up.railway.app"}
+LOG_FILE     = Path("forge.log")
+
+swarm_log.setup(LOG_FILE, console=True)
+log = logging.getLogger("forge")
 # ---------- UTILS ----------
 # ---------- bullet-proof helpers ----------
-def safe_ask(prompt, model="gpt-4o-mini"):
+def safe_ask(prompt, model="gpt-4o-mini", seed=None):
+    # `seed` only feeds the cache key: same prompt + seed replays, a new seed asks again
+    key = CACHE.key("ask", model=model, prompt=prompt, seed=seed)
+    hit = CACHE.get(key)
+    if hit is not None:
+        return hit.decode()
     try:
         r = httpx.post(
             "https://openrouter.ai/api/v1/chat/completions",
@@ -20,22 +33,37 @@ def safe_ask(prompt, model="gpt-4o-mini"):
             json={"model": model, "messages": [{"role": "user", "content": prompt}]},
             timeout=30
         )
-        return r.json()["choices"][0]["message"]["content"].strip()
+        content = r.json()["choices"][0]["message"]["content"].strip()
+        CACHE.put(key, content.encode())
+        return content
     except Exception as e:
-        print("⚠️ ask fail", e)
+        log.warning(f"⚠️ ask fail {e}")
         return '{"niche":"fallback","title":"Fallback Asset","hook":"Instant €2 download"}'
 
-def safe_dalle(prompt):
+def safe_dalle(prompt, dest):
+    """stream the generated image to `dest` in chunks -> dest, or None on failure"""
+    dest = Path(dest)
+    key = CACHE.key("image", model="dall-e-3", prompt=prompt, size="1024x1024")
+    if CACHE.get_file(key, dest):
+        return dest
     try:
         import openai
         client = openai.OpenAI(api_key=os.getenv("OPENROUTER_KEY"),
                                base_url="https://openrouter.ai/api/v1")
         url = client.images.generate(model="dall-e-3", prompt=prompt,
                                      size="1024x1024", n=1).data[0].url
-        return httpx.get(url, timeout=30).content
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(dest.name + ".part")
+        with httpx.stream("GET", url, timeout=30) as r, open(tmp, "wb") as f:
+            r.raise_for_status()
+            for chunk in r.iter_bytes(64 * 1024):
+                f.write(chunk)
+        os.replace(tmp, dest)
+        CACHE.put_file(key, dest)
+        return dest
     except Exception as e:
-        print("⚠️ dalle fail", e)
-        return b""
+        log.warning(f"⚠️ dalle fail {e}")
+        return None
 
 def safe_gumroad(slug, title):
     try:
@@ -43,79 +71,276 @@ def safe_gumroad(slug, title):
             "https://api.gumroad.com/v2/products",
             headers={"Authorization": f"Bearer {os.getenv('GUMROAD_TOKEN')}"},
             json={"name": title, "url": slug, "price": 200,
-                  "description": "AI-generated micro-asset", "published": True},
+                  "description": "AI-generated micro-asset", "published": False},
             timeout=30
         )
         return r.json()["product"]["id"]
     except Exception as e:
-        print("⚠️ gumroad fail", e)
+        log.warning(f"⚠️ gumroad fail {e}")
         return None
 
-# ---------- STATE ----------
-state = json.loads(STATE_FILE.read_text()) if STATE_FILE.exists() else {"swarm": []}
+def safe_publish(prod_id):
+    # products start as drafts; only a fully shipped one (file + landing page) goes live
+    try:
+        r = httpx.put(
+            f"https://api.gumroad.com/v2/products/{prod_id}/enable",
+            headers={"Authorization": f"Bearer {os.getenv('GUMROAD_TOKEN')}"},
+            timeout=30
+        )
+        r.raise_for_status()
+        return True
+    except Exception as e:
+        log.warning(f"⚠️ publish fail {e}")
+        return False
 
-# ---------- CORE LOOP ----------
-def spawn():
-    meta = json.loads(safe_ask("Return ONLY JSON {\"niche\":\"neon icons\",\"title\":\"Neon Icon Pack\"}"))
-    slug = meta["niche"].lower().replace(" ", "-")
-    prod_id = safe_gumroad(slug, meta["title"])
-    if not prod_id:
-        print("Skipping spawn – Gumroad down")
-        return
-    # (rest of zip + Railway deploy remains the same)
-    print(f"🔥 LIVE: https://gum.co/{slug}")
+def safe_upload(prod_id, slug, path):
+    # httpx reads an open file in chunks, so the multipart body streams from disk
+    try:
+        with open(path, "rb") as f:
+            r = httpx.post(
+                f"https://api.gumroad.com/v2/products/{prod_id}/files",
+                headers={"Authorization": f"Bearer {os.getenv('GUMROAD_TOKEN')}"},
+                files={"file": (f"{slug}.zip", f, "application/zip")},
+                timeout=120
+            )
+        r.raise_for_status()
+        return True
+    except Exception as e:
+        log.warning(f"⚠️ upload fail {e}")
+        return False
+
+# ---------- IDEAS ----------
+# one LLM call returns IDEA_BATCH candidates; they are validated, deduped
+# against the swarm and the buffer, persisted to IDEAS_FILE and handed out
+# one per spawn. A background refill starts when the buffer runs low, so
+# spawns rarely wait on the LLM.
+IDEAS_FILE = Path("forge_ideas.json")
+IDEA_BATCH = int(os.getenv("IDEA_BATCH", 10))
+IDEA_LOW   = max(1, IDEA_BATCH // 3)
+IDEA_PROMPT = ("Return ONLY a JSON array of {k} distinct digital-asset product ideas, each "
+               "{{\"niche\":\"neon icons\",\"title\":\"Neon Icon Pack\",\"hook\":\"one-line pitch\"}}. "
+               "Avoid these niches: {avoid}")
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:60]
+
+def parse_ideas(raw):
+    raw = raw.strip()
+    if raw.startswith("```"):                  # tolerate fenced replies
+        raw = raw.strip("`").split("\n", 1)[-1]
+    start = min([i for i in (raw.find("["), raw.find("{")) if i >= 0], default=-1)
+    try:
+        data = json.loads(raw[start:]) if start >= 0 else []
+    except ValueError:
+        try:
+            data = json.loads(raw[start:raw.rfind("]" if raw[start] == "[" else "}") + 1])
+        except ValueError:
+            return []
+    data = data if isinstance(data, list) else [data]
+    ideas = []
+    for d in data:
+        if not isinstance(d, dict):
+            continue
+        niche, title = str(d.get("niche", "")).strip(), str(d.get("title", "")).strip()
+        slug = slugify(niche)
+        if not slug or not title or len(title) > 100:
+            continue
+        ideas.append({"niche": niche, "title": title, "slug": slug,
+                      "hook": str(d.get("hook") or "Instant download").strip()[:200]})
+    return ideas
+
+class IdeaQueue:
+    def __init__(self, path, k=IDEA_BATCH, low=IDEA_LOW):
+        self.path = path
+        self.k = k
+        self.low = low
+        self.batches = 0
+        self.buf = json.loads(path.read_text()) if path.exists() else []
+        self._lock = threading.Lock()
+        self._refilling = None
+
+    def _save(self):
+        self.path.write_text(json.dumps(self.buf, indent=2))
+
+    def refill(self):
+        taken = set(STATE.snapshot().by_slug)
+        with self._lock:
+            taken |= {i["slug"] for i in self.buf}
+            self.batches += 1
+            seed = f"{time.strftime('%Y%m%d%H')}:batch{self.batches}"
+        avoid = ", ".join(sorted(taken)[-50:]) or "none"
+        raw = safe_ask(IDEA_PROMPT.format(k=self.k, avoid=avoid), seed=seed)
+        fresh = []
+        for idea in parse_ideas(raw):
+            if idea["slug"] not in taken:
+                taken.add(idea["slug"])
+                fresh.append(idea)
+        with self._lock:
+            self.buf.extend(i for i in fresh if i["slug"] not in {b["slug"] for b in self.buf})
+            self._save()
+        log.info(f"💡 {len(fresh)} new ideas buffered")
+        return len(fresh)
+
+    def _prefetch(self):
+        if self._refilling and self._refilling.is_alive():
+            return
+        self._refilling = threading.Thread(target=self.refill, name="idea-refill", daemon=True)
+        self._refilling.start()
+
+    def take(self):
+        """next buffered idea, refilling when empty; None if the LLM gave nothing usable"""
+        for _ in range(2):
+            with self._lock:
+                if self.buf:
+                    idea = self.buf.pop(0)
+                    self._save()
+                    if len(self.buf) <= self.low:
+                        self._prefetch()
+                    return idea
+            if self._refilling and self._refilling.is_alive():
+                self._refilling.join()
+            else:
+                self.refill()
+        return None
 
-    # 2. AI image
-    img = dall_e(f"A cool marketing thumbnail for '{meta['title']}', cyberpunk style, 1024x1024")
+IDEAS = IdeaQueue(IDEAS_FILE)
 
-    # 3. Build .zip
-    zbuf = io.BytesIO()
-    with zipfile.ZipFile(zbuf, "w") as z:
+# ---------- PIPELINE ----------
+# idea -> build (image || draft gumroad product, then zip) -> upload -> deploy
+# (railway up, then publish the draft).
+# Each stage has its own worker count and a bounded queue in front of it,
+# so several products are in flight and the slowest upstream sets the pace.
+# The helpers stay blocking and run on worker threads.
+STAGE_WORKERS = {"idea": 1, "build": 3, "upload": 2, "deploy": 2}
+QUEUE_SIZE    = 4
+STOP          = object()
+
+ASSET_DIR     = Path("forge_assets")
+PHASHES       = image_pipeline.PhashIndex(ASSET_DIR / "phash.json")
+ZIP_ASSETS    = ("preview.opt.png", "preview.webp", "thumb.png", "cover.png")
+
+def build_zip(meta, assets, dest):
+    """assets: arcname -> path on disk. Members are streamed from disk into
+    the archive file at `dest`, so memory stays flat whatever the pack size -> dest"""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + ".part")
+    with zipfile.ZipFile(tmp, "w") as z:
         z.writestr("README.txt", f"{meta['title']}\n{meta['hook']}")
-        if img:
-            z.writestr("preview.png", img)
+        for arcname, path in assets.items():
+            z.write(path, arcname)           # copied in chunks, never read whole
         z.writestr("license.txt", "Royalty-free for personal & commercial.")
-    zbuf.seek(0)
-
-    # 4. Gumroad product
-    r = gumroad_post("products", json={
-        "name": meta["title"],
-        "url": slug,
-        "price": 200,
-        "description": meta["hook"],
-        "published": True
-    })
-    prod_id = r.json()["product"]["id"]
-    gumroad_post(f"products/{prod_id}/files", files={"file": (f"{slug}.zip", zbuf.read())})
-    gum_url = f"https://gum.co/{slug}"
-
-    # 5. Flask landing page
+    os.replace(tmp, dest)
+    return dest
+
+async def make_assets(slug, src):
+    """derivatives on the process pool; {} when the preview nearly duplicates a shipped one"""
+    try:
+        out = await image_pipeline.derive_async(src, src.parent)
+    except Exception as e:                   # truncated / non-image download: ship without a preview
+        log.warning(f"⚠️ preview fail {slug} {e}")
+        return {}
+    dup = PHASHES.claim(slug, out["hash"])
+    if dup:
+        log.warning(f"Skipping preview for {slug} – near-duplicate of {dup}")
+        return {}
+    return {name: out["files"][name] for name in ZIP_ASSETS}
+
+async def stage_idea(n):
+    return await asyncio.to_thread(IDEAS.take)
+
+async def stage_build(meta, claimed):
+    slug = meta["slug"]
+    if slug in claimed or STATE.snapshot().get(slug):
+        log.warning(f"Skipping {slug} – already spawned")
+        return None
+    claimed.add(slug)
+    # image and gumroad product don't depend on each other
+    img, prod_id = await asyncio.gather(
+        asyncio.to_thread(safe_dalle, f"A cool marketing thumbnail for '{meta['title']}', cyberpunk style, 1024x1024",
+                          ASSET_DIR / slug / "original.png"),
+        asyncio.to_thread(safe_gumroad, slug, meta["title"]))
+    if not prod_id:
+        log.warning(f"Skipping {slug} – Gumroad down")
+        claimed.discard(slug)
+        return None
+    assets = await make_assets(slug, img) if img else {}
+    zpath = await asyncio.to_thread(build_zip, meta, assets, ASSET_DIR / slug / f"{slug}.zip")
+    return {**meta, "prod_id": prod_id, "zip": zpath}
+
+async def stage_upload(job):
+    zpath = job.pop("zip")
+    try:
+        ok = await asyncio.to_thread(safe_upload, job["prod_id"], job["slug"], zpath)
+    finally:
+        zpath.unlink(missing_ok=True)        # the pack lives on gumroad now (or never will)
+    if not ok:
+        log.warning(f"Skipping {job['slug']} – upload failed, left as a Gumroad draft")
+        return None
+    return job
+
+async def stage_deploy(job):
+    slug, gum_url = job["slug"], f"https://gum.co/{job['slug']}"
     folder = pathlib.Path(f"swarm/{slug}")
-    folder.mkdir(exist_ok=True)
-    folder.joinpath("app.py").write_text(textwrap.dedent(f"""
-        from flask import Flask, send_file, abort
-        import qrcode, io, os
-        app = Flask(__name__)
-        @app.route("/")
-        def page():
-            qr = qrcode.make("{gum_url}")
-            buf = io.BytesIO(); qr.save(buf, format="PNG"); buf.seek(0)
-            return send_file(buf, mimetype="image/png")
-        if __name__ == "__main__":
-            port = int(os.environ.get("PORT", 5000))
-            app.run(host="0.0.0.0", port=port)
-    """).lstrip())
-    folder.joinpath("requirements.txt").write_text("flask qrcode pillow")
-    folder.joinpath("Procfile").write_text("web: python app.py")
-
-    subprocess.run("railway up", shell=True, cwd=folder, capture_output=True)
-    state["swarm"].append({"slug": slug, "railway": f"https://{slug}-production.up.railway.app", "gumroad": gum_url})
-    STATE_FILE.write_text(json.dumps(state, indent=2))
-    print(f"🔥 LIVE: {gum_url}")
-
-def autopilot():
+    await asyncio.to_thread(landing_bundle.build_bundle, slug, gum_url, folder, job["title"])
+    proc = await asyncio.create_subprocess_shell("railway up", cwd=folder,
+                                                 stdout=asyncio.subprocess.DEVNULL,
+                                                 stderr=asyncio.subprocess.PIPE)
+    _, err = await proc.communicate()
+    if proc.returncode:
+        log.warning(f"Skipping {slug} – railway up exited {proc.returncode}, left as a Gumroad draft: "
+                    f"{err.decode(errors='replace')[-300:].strip()}")
+        return None
+    if not await asyncio.to_thread(safe_publish, job.pop("prod_id")):
+        log.warning(f"Skipping {slug} – publish failed, left as a Gumroad draft")
+        return None
+    JOURNAL.append({"slug": slug, "railway": f"https://{slug}-production.up.railway.app", "gumroad": gum_url, "title": job["title"]})
+    log.info(f"🔥 LIVE: {gum_url}")
+    return job
+
+async def run_stage(name, fn, inq, outq):
+    async def worker():
+        while True:
+            item = await inq.get()
+            if item is STOP:
+                await inq.put(STOP)          # let sibling workers see it too
+                return
+            try:
+                out = await fn(item)
+            except Exception as e:
+                log.warning(f"⚠️ {name} fail {e}")
+                continue
+            if out is not None and outq is not None:
+                await outq.put(out)
+    await asyncio.gather(*(worker() for _ in range(STAGE_WORKERS[name])))
+    if outq is not None:
+        await outq.put(STOP)
+
+async def pipeline(count):
+    qs = [asyncio.Queue(QUEUE_SIZE) for _ in range(4)]
+    claimed, done = set(), []
+    async def feed():
+        for n in range(count):
+            await qs[0].put(n)
+        await qs[0].put(STOP)
+    async def deploy(job):
+        if await stage_deploy(job):
+            done.append(job["slug"])
+    await asyncio.gather(
+        feed(),
+        run_stage("idea", stage_idea, qs[0], qs[1]),
+        run_stage("build", lambda m: stage_build(m, claimed), qs[1], qs[2]),
+        run_stage("upload", stage_upload, qs[2], qs[3]),
+        run_stage("deploy", deploy, qs[3], None))
+    return done
+
+# ---------- CORE LOOP ----------
+def spawn(count=1):
+    return asyncio.run(pipeline(count))
+
+def autopilot(count=1):
     while True:
-        spawn()
+        spawn(count)
         time.sleep(3600)  # 1 h tonight, change to 7200 for 2 h
 
 if __name__ == "__main__":
@@ -123,10 +348,11 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--bootstrap", action="store_true")
     ap.add_argument("--spawn-once", action="store_true")
+    ap.add_argument("--count", type=int, default=1, help="products per wave")
     args = ap.parse_args()
     if args.bootstrap:
-        autopilot()
+        autopilot(args.count)
     elif args.spawn_once:
-        spawn()
+        spawn(args.count)
     else:
         ap.print_help(sys.stderr)
\ No newline at end of file
@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+http_cache.py  –  conditional-request helpers shared by app, landing_host and commander
+"""
+
+def etag_match(header, etag):
+    """If-None-Match check: `*` or any listed tag equal to `etag` (weak comparison)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == bare for t in header.split(","))
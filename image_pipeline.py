@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+image_pipeline.py  –  preview derivatives on a process pool + near-duplicate check
+
+derive_async() fans one streamed-to-disk original out over a process
+pool. Each derivative in DERIVATIVES and the 64-bit difference hash
+(dHash) run as separate tasks, so one image uses every core.
+PhashIndex keeps the hashes of previews already shipped, so a new
+preview within DUP_DISTANCE bits of one of them counts as a
+near-duplicate and is skipped.
+"""
+import json, os, threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image
+
+DUP_DISTANCE = int(os.getenv("PHASH_DISTANCE", 6))
+
+# name -> (size, mode, format); mode "fit" keeps aspect inside the box, "cover" crops to fill it
+DERIVATIVES = {
+    "thumb.webp":   ((256, 256),   "fit",   "WEBP"),
+    "thumb.png":    ((256, 256),   "fit",   "PNG"),
+    "square.webp":  ((600, 600),   "cover", "WEBP"),
+    "cover.png":    ((1280, 720),  "cover", "PNG"),     # gumroad listing cover
+    "cover.webp":   ((1280, 720),  "cover", "WEBP"),
+    "preview.webp": ((1024, 1024), "fit",   "WEBP"),
+    "preview.opt.png": ((1024, 1024), "fit", "PNG"),
+}
+
+def dhash(im, size=8):
+    g = im.convert("L").resize((size + 1, size), Image.LANCZOS)
+    px = g.load()
+    bits = 0
+    for y in range(size):
+        for x in range(size):
+            bits = (bits << 1) | (px[x, y] > px[x + 1, y])
+    return bits
+
+def _resize(im, size, mode):
+    if mode == "cover":
+        w, h = im.size
+        scale = max(size[0] / w, size[1] / h)
+        im = im.resize((max(1, round(w * scale)), max(1, round(h * scale))), Image.LANCZOS)
+        left, top = (im.width - size[0]) // 2, (im.height - size[1]) // 2
+        return im.crop((left, top, left + size[0], top + size[1]))
+    im = im.copy()
+    im.thumbnail(size, Image.LANCZOS)
+    return im
+
+def derive_one(src, out_dir, name):
+    """worker: write one derivative of `src` -> its path"""
+    size, mode, fmt = DERIVATIVES[name]
+    path = Path(out_dir) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    opts = {"optimize": True} if fmt == "PNG" else {"quality": 82, "method": 4}
+    with Image.open(src) as im:
+        im.draft("RGB", size)                  # lets JPEG sources decode at reduced size
+        _resize(im.convert("RGB"), size, mode).save(path, fmt, **opts)
+    return str(path)
+
+def phash(src):
+    with Image.open(src) as im:
+        return dhash(im)
+
+def derive(src, out_dir):
+    """all derivatives + hash in this process -> {"hash": int, "files": {name: path}}"""
+    return {"hash": phash(src), "files": {n: derive_one(src, out_dir, n) for n in DERIVATIVES}}
+
+async def derive_async(src, out_dir, names=None):
+    """fan one image out across the pool: one task per derivative plus the hash"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    names = list(names or DERIVATIVES)
+    h, *paths = await asyncio.gather(
+        loop.run_in_executor(pool(), phash, str(src)),
+        *(loop.run_in_executor(pool(), derive_one, str(src), str(out_dir), n) for n in names))
+    return {"hash": h, "files": dict(zip(names, paths))}
+
+_pool = None
+
+def pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _pool
+
+class PhashIndex:
+    """slug -> dHash of every preview shipped so far, persisted as JSON"""
+    def __init__(self, path, distance=DUP_DISTANCE):
+        self.path = Path(path)
+        self.distance = distance
+        self.hashes = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self._lock = threading.Lock()
+
+    def near(self, h):
+        for slug, other in self.hashes.items():
+            if bin(h ^ other).count("1") <= self.distance:
+                return slug
+        return None
+
+    def claim(self, slug, h):
+        """register h for slug unless it nearly matches a shipped preview -> matching slug or None"""
+        with self._lock:
+            dup = self.near(h)
+            if dup is None:
+                self.hashes[slug] = h
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.path.write_text(json.dumps(self.hashes))
+            return dup
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+landing_bundle.py  –  static pre-rendered landing pages, zero Python per request
+python landing_bundle.py --all [--out swarm]   # (re)export every slug in forge_state.json
+
+Bundle layout (swarm/<slug>/):
+    index.html(.gz/.br)       QR + buy link
+    qr.png, qr.svg(.gz/.br)   pre-rendered by qr_engine
+    buy/index.html(.gz/.br)   meta-refresh fallback for /buy
+    _redirects                /buy -> gumroad (Netlify / Cloudflare Pages syntax)
+    Staticfile                tells nixpacks to serve the folder as static files
+"""
+import gzip, html
+from pathlib import Path
+import qr_engine
+from swarm_state import StateCache
+
+try:
+    import brotli
+except ImportError:          # .br variants are skipped without it
+    brotli = None
+
+ROOT    = Path(__file__).parent
+STATE_F = ROOT / "forge_state.json"
+COMPRESS_SUFFIXES = {".html", ".svg"}     # png is already deflated
+
+INDEX = """<!doctype html>
+<html lang="en"><head><meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<title>{title}</title>
+<style>body{{font-family:system-ui,sans-serif;text-align:center;margin:2rem}}img{{max-width:80vw;height:auto}}</style>
+</head><body>
+<h1>{title}</h1>
+<a href="buy/"><img src="qr.svg" width="{side}" height="{side}" alt="QR code for {gum}"></a>
+<p><a href="buy/">Buy on Gumroad</a></p>
+</body></html>
+"""
+
+BUY = """<!doctype html>
+<html lang="en"><head><meta charset="utf-8">
+<meta http-equiv="refresh" content="0; url={gum}">
+<link rel="canonical" href="{gum}">
+<title>Redirecting…</title>
+</head><body><a href="{gum}">{gum}</a></body></html>
+"""
+
+def _write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if path.suffix in COMPRESS_SUFFIXES:
+        path.with_name(path.name + ".gz").write_bytes(gzip.compress(data, 9, mtime=0))
+        if brotli:
+            path.with_name(path.name + ".br").write_bytes(brotli.compress(data, quality=11))
+
+def build_bundle(slug, gum_url, out_dir, title=None):
+    out = Path(out_dir)
+    m = qr_engine.matrix(gum_url)
+    _write(out / "qr.png", qr_engine.to_png(m))
+    _write(out / "qr.svg", qr_engine.to_svg(m))
+    esc = html.escape(gum_url, quote=True)
+    _write(out / "index.html", INDEX.format(title=html.escape(title or slug), gum=esc,
+                                             side=m.shape[0] * 10).encode())
+    _write(out / "buy" / "index.html", BUY.format(gum=esc).encode())
+    _write(out / "_redirects", f"/buy {gum_url} 302\n/buy/ {gum_url} 302\n".encode())
+    _write(out / "Staticfile", b"root: .\n")
+    return out
+
+def export_all(out_root=ROOT / "swarm", state_file=STATE_F):
+    swarm = StateCache(state_file).snapshot()
+    for s in swarm:
+        build_bundle(s["slug"], s["gumroad"], Path(out_root) / s["slug"], s.get("title"))
+        print(f"📦 {s['slug']}")
+    return len(swarm)
+
+if __name__ == "__main__":
+    import argparse, sys
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--all", action="store_true")
+    ap.add_argument("--out", default=str(ROOT / "swarm"))
+    args = ap.parse_args()
+    if args.all:
+        print(f"✅ exported {export_all(args.out)} bundles")
+    else:
+        ap.print_help(sys.stderr)
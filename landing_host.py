@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+landing_host.py  –  one WSGI app serving every swarm landing page
+gunicorn landing_host:app
+
+Routes by Host header (the slug's railway host, or <slug>.<anything>)
+or by path prefix (/<slug>/, /<slug>/buy). forge_state.json is re-read
+whenever its mtime changes, so new slugs go live without a restart.
+"""
+import os, hashlib
+from pathlib import Path
+from urllib.parse import urlsplit
+from flask import Flask, Response, request, redirect, abort
+import qr_engine
+from http_cache import etag_match
+from swarm_state import StateCache
+
+ROOT    = Path(__file__).parent
+STATE_F = ROOT / "forge_state.json"
+CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+app = Flask(__name__)
+
+# ---------- routing table ----------
+class Fleet:
+    def __init__(self, path):
+        self.state = StateCache(path)
+        self.snap = None
+        self.slugs = {}       # slug -> swarm entry
+        self.hosts = {}       # railway host -> slug
+        self.qr = {}          # slug -> (png, etag, gumroad url)
+
+    def refresh(self):
+        snap = self.state.snapshot()
+        if snap is self.snap:
+            return
+        self.slugs = snap.by_slug
+        self.hosts = {urlsplit(s["railway"]).hostname: s["slug"]
+                      for s in snap if s.get("railway")}
+        self.qr = {k: v for k, v in self.qr.items() if k in self.slugs
+                   and self.slugs[k].get("gumroad") == v[2]}
+        self.snap = snap
+
+    def by_host(self, host):
+        host = (host or "").split(":")[0].lower()
+        if host in self.hosts:
+            return self.hosts[host]
+        first = host.split(".")[0]
+        return first if first in self.slugs else None
+
+    def qr_png(self, slug):
+        hit = self.qr.get(slug)
+        if hit:
+            return hit
+        gum = self.slugs[slug]["gumroad"]
+        png = qr_engine.render(gum)
+        hit = self.qr[slug] = (png, '"' + hashlib.sha256(png).hexdigest()[:32] + '"', gum)
+        return hit
+
+FLEET = Fleet(STATE_F)
+
+# ---------- handlers ----------
+def _page(slug):
+    png, etag, _ = FLEET.qr_png(slug)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_match(request.headers.get("If-None-Match"), etag):
+        return Response(status=304, headers=headers)
+    return Response(png, mimetype="image/png", headers=headers)
+
+def _buy(slug):
+    return redirect(FLEET.slugs[slug]["gumroad"])
+
+@app.before_request
+def _refresh():
+    FLEET.refresh()
+
+@app.route("/")
+def host_page():
+    slug = FLEET.by_host(request.host)
+    if not slug:
+        abort(404)
+    return _page(slug)
+
+@app.route("/buy")
+def host_buy():
+    slug = FLEET.by_host(request.host)
+    if not slug:
+        abort(404)
+    return _buy(slug)
+
+@app.route("/health")
+def health():
+    return {"slugs": len(FLEET.slugs)}, 200
+
+@app.route("/<slug>/")
+def prefix_page(slug):
+    if slug not in FLEET.slugs:
+        abort(404)
+    return _page(slug)
+
+@app.route("/<slug>/buy")
+def prefix_buy(slug):
+    if slug not in FLEET.slugs:
+        abort(404)
+    return _buy(slug)
+
+if __name__ == "__main__":
+    port = int(os.environ.get("PORT", 5000))
+    app.run(host="0.0.0.0", port=port)
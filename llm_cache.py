@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+llm_cache.py  –  content-addressed disk cache for forge's upstream calls
+
+Entries live at <root>/<ab>/<sha256> where the hash covers
+(kind, model, prompt, params). Modes (FORGE_CACHE):
+    readthrough  serve fresh hits, call upstream on a miss and store it (default)
+    replay       serve any hit regardless of TTL; a miss raises CacheMiss
+    off          bypass entirely
+Entries older than the TTL are misses in readthrough mode. Once the
+cache passes its byte budget, least-recently-used files are evicted.
+"""
+import hashlib, json, os, shutil, threading, time
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+
+class CacheMiss(Exception):
+    pass
+
+class DiskCache:
+    def __init__(self, root, ttl=30 * 86400, max_bytes=2 * 1024 ** 3, mode="readthrough"):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = self.misses = 0
+        self._bytes = None            # lazily summed on first write
+        self._lock = threading.Lock()
+
+    def key(self, kind, **parts):
+        raw = json.dumps({"kind": kind, **parts}, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _path(self, key):
+        return self.root / key[:2] / key
+
+    def get(self, key):
+        """cached bytes or None; in replay mode a miss raises CacheMiss"""
+        if self.mode == "off":
+            return None
+        p = self._path(key)
+        try:
+            st = p.stat()
+            if self.mode != "replay" and time.time() - st.st_mtime > self.ttl:
+                raise FileNotFoundError
+            data = p.read_bytes()
+            os.utime(p, (time.time(), st.st_mtime))      # atime = LRU clock, mtime = age
+        except FileNotFoundError:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(key)
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if self.mode != "readthrough" or not data:
+            return
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, p)
+        self._account(len(data))
+
+    def get_file(self, key, dest):
+        """copy a hit to `dest` without loading it into memory -> True on hit"""
+        if self.mode == "off":
+            return False
+        p = self._path(key)
+        try:
+            st = p.stat()
+            if self.mode != "replay" and time.time() - st.st_mtime > self.ttl:
+                raise FileNotFoundError
+            Path(dest).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(p, dest)
+            os.utime(p, (time.time(), st.st_mtime))
+        except FileNotFoundError:
+            self.misses += 1
+            if self.mode == "replay":
+                raise CacheMiss(key)
+            return False
+        self.hits += 1
+        return True
+
+    def put_file(self, key, src):
+        if self.mode != "readthrough":
+            return
+        size = os.path.getsize(src)
+        if not size:
+            return
+        p = self._path(key)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, p)
+        self._account(size)
+
+    def _account(self, size):
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = sum(f.stat().st_size for f in self.root.glob("??/*"))
+            else:
+                self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = []
+        for f in self.root.glob("??/*"):
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_atime, st.st_size, f))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, f in files:
+            if total <= target:
+                break
+            f.unlink(missing_ok=True)
+            total -= size
+        self._bytes = total
+
+CACHE = DiskCache(os.getenv("FORGE_CACHE_DIR", ROOT / ".forge_cache"),
+                  ttl=float(os.getenv("FORGE_CACHE_TTL", 30 * 86400)),
+                  max_bytes=int(os.getenv("FORGE_CACHE_BYTES", 2 * 1024 ** 3)),
+                  mode=os.getenv("FORGE_CACHE", "readthrough"))
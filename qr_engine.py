@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+qr_engine.py  –  QR module matrix -> compact SVG / 1-bit palette PNG, no PIL
+python qr_engine.py --bench   # renders/sec + bytes vs the qrcode/PIL path
+"""
+import io, struct, time, zlib
+import numpy as np
+import qrcode
+
+EC_LEVELS = {"L": qrcode.constants.ERROR_CORRECT_L, "M": qrcode.constants.ERROR_CORRECT_M,
+             "Q": qrcode.constants.ERROR_CORRECT_Q, "H": qrcode.constants.ERROR_CORRECT_H}
+MIMETYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+PNG_SIG  = b"\x89PNG\r\n\x1a\n"
+PLTE_BW  = b"\xff\xff\xff\x00\x00\x00"       # index 0 = light, 1 = dark
+
+# ---------- matrix ----------
+def matrix(data, ec="M", border=4):
+    """bool array of modules (True = dark), quiet zone included"""
+    q = qrcode.QRCode(border=border, error_correction=EC_LEVELS[ec])
+    q.add_data(data)
+    q.make(fit=True)
+    return np.array(q.get_matrix(), dtype=bool)
+
+# ---------- writers ----------
+def _chunk(tag, payload):
+    return (struct.pack(">I", len(payload)) + tag + payload
+            + struct.pack(">I", zlib.crc32(tag + payload) & 0xFFFFFFFF))
+
+def to_png(m, box=10):
+    """1-bit palette PNG: scale with np.repeat, pack 8 px/byte, deflate"""
+    n = m.shape[0]
+    side = n * box
+    row_bits = np.repeat(m, box, axis=1)                    # one scanline per module row
+    rows = np.packbits(row_bits, axis=1)                    # MSB first, zero padded
+    rows = np.hstack([np.zeros((n, 1), np.uint8), rows])    # filter type 0 per scanline
+    raw = np.repeat(rows, box, axis=0).tobytes()
+    ihdr = struct.pack(">IIBBBBB", side, side, 1, 3, 0, 0, 0)
+    return (PNG_SIG + _chunk(b"IHDR", ihdr) + _chunk(b"PLTE", PLTE_BW)
+            + _chunk(b"IDAT", zlib.compress(raw, 9)) + _chunk(b"IEND", b""))
+
+def to_svg(m, box=10):
+    """one <path> of horizontal runs in module units; viewBox does the scaling"""
+    n = m.shape[0]
+    padded = np.zeros((n, n + 2), dtype=np.int8)
+    padded[:, 1:-1] = m
+    edges = np.diff(padded, axis=1)
+    ys, xs = np.nonzero(edges)
+    d = []
+    for (y, x0), (_, x1) in zip(zip(ys[0::2], xs[0::2]), zip(ys[1::2], xs[1::2])):
+        d.append(f"M{x0} {y}h{x1 - x0}v1h{x0 - x1}z")
+    side = n * box
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{side}" height="{side}" '
+            f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">'
+            f'<rect width="{n}" height="{n}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(d)}"/></svg>').encode()
+
+def render(data, fmt="png", box=10, ec="M", border=4):
+    m = matrix(data, ec=ec, border=border)
+    return to_svg(m, box) if fmt == "svg" else to_png(m, box)
+
+# ---------- benchmark ----------
+def _pil(data):
+    buf = io.BytesIO()
+    qrcode.make(data).save(buf, "PNG")
+    return buf.getvalue()
+
+def bench(n=200):
+    urls = [f"https://gum.co/ai-product-{i:06x}" for i in range(n)]
+    m = matrix(urls[0])
+    paths = {
+        "pil png (qrcode.make)": _pil,
+        "engine png":            lambda u: render(u, "png"),
+        "engine svg":            lambda u: render(u, "svg"),
+        "engine png (matrix cached)": lambda u: to_png(m),
+        "engine svg (matrix cached)": lambda u: to_svg(m),
+    }
+    print(f"{'path':30} {'renders/s':>10} {'bytes/img':>10}")
+    for name, fn in paths.items():
+        t0 = time.perf_counter()
+        size = sum(len(fn(u)) for u in urls)
+        dt = time.perf_counter() - t0
+        print(f"{name:30} {n / dt:10.0f} {size / n:10.0f}")
+
+if __name__ == "__main__":
+    import argparse, sys
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--bench", action="store_true")
+    ap.add_argument("-n", type=int, default=200)
+    args = ap.parse_args()
+    if args.bench:
+        bench(args.n)
+    else:
+        ap.print_help(sys.stderr)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+revenue_rollups.py  –  per-slug + fleet revenue/sales time series in NumPy
+python revenue_rollups.py --check   # regression check for bucket retention
+
+Each resolution is a (slug × bucket) matrix of revenue and sale counts.
+New sales are folded in incrementally: only rows past the last seen
+rowid are read, bucketed with integer division and added with one
+np.bincount per matrix. Series, moving averages (cumsum) and top-N
+movers (argpartition) are then array slices, not Python loops over sales.
+Hourly history is capped to a rolling window to bound memory.
+"""
+import threading, time
+import numpy as np
+
+DAY, HOUR = 86400, 3600
+
+class Rollup:
+    def __init__(self, step, keep=None):
+        self.step = step
+        self.keep = keep                       # max buckets kept (None = all history)
+        self.b0 = None                         # absolute bucket number of column 0
+        self.rev = np.zeros((0, 0), np.int64)
+        self.cnt = np.zeros((0, 0), np.int32)
+
+    def _resize(self, rows, lo, hi):
+        """make the matrix cover slug rows [0, rows) and absolute buckets [lo, hi]"""
+        if self.b0 is None:
+            self.b0 = lo
+        lo = min(lo, self.b0)
+        if self.keep:
+            lo = max(lo, hi - self.keep + 1)
+        cols = hi - lo + 1
+        if (rows, cols) == self.rev.shape and lo == self.b0:
+            return
+        rev = np.zeros((rows, cols), np.int64)
+        cnt = np.zeros((rows, cols), np.int32)
+        old_r, old_c = self.rev.shape
+        src = max(0, lo - self.b0)             # columns that fall off the left edge
+        dst = max(0, self.b0 - lo)
+        width = min(old_c - src, cols - dst)
+        if old_r and width > 0:
+            rev[:old_r, dst:dst + width] = self.rev[:, src:src + width]
+            cnt[:old_r, dst:dst + width] = self.cnt[:, src:src + width]
+        self.rev, self.cnt, self.b0 = rev, cnt, lo
+
+    def add(self, rows, sidx, ts, price, now):
+        buckets = ts // self.step
+        hi = int(max(buckets.max(initial=0), now // self.step))
+        if self.b0 is not None:                # never cut off buckets an earlier batch reached
+            hi = max(hi, self.b0 + self.rev.shape[1] - 1)
+        lo = int(buckets.min(initial=hi))
+        self._resize(rows, lo, hi)
+        col = buckets - self.b0
+        ok = col >= 0                          # older than the kept window
+        flat = sidx[ok] * self.rev.shape[1] + col[ok]
+        size = self.rev.size
+        self.rev += np.bincount(flat, weights=price[ok], minlength=size).astype(np.int64).reshape(self.rev.shape)
+        self.cnt += np.bincount(flat, minlength=size).astype(np.int32).reshape(self.cnt.shape)
+
+def moving_average(x, w):
+    c = np.cumsum(np.concatenate(([0], x)), dtype=np.float64)
+    i = np.arange(1, len(x) + 1)
+    lo = np.maximum(0, i - w)
+    return (c[i] - c[lo]) / (i - lo)
+
+class RevenueRollups:
+    def __init__(self, store, hour_window=14 * 24):
+        self.store = store
+        self.index = {}                        # slug -> matrix row
+        self.slugs = []
+        self.last_rowid = 0
+        self.seen_version = None
+        self.res = {"day": Rollup(DAY), "hour": Rollup(HOUR, keep=hour_window)}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """fold in sales written since the last call"""
+        if self.seen_version == self.store.version:
+            return
+        with self._lock:
+            version = self.store.version
+            rows = self.store.rows_since(self.last_rowid)
+            if rows:
+                self.last_rowid = rows[-1][0]
+            rows = [r for r in rows if r[2] is not None]    # undated sales would stretch back to 1970
+            if rows:
+                for _, slug, _, _ in rows:
+                    if slug not in self.index:
+                        self.index[slug] = len(self.slugs)
+                        self.slugs.append(slug)
+                arr = np.array([(r[0], self.index[r[1]], r[2], r[3]) for r in rows], np.int64)
+                now = int(time.time())
+                for roll in self.res.values():
+                    roll.add(len(self.slugs), arr[:, 1], arr[:, 2], arr[:, 3], now)
+            self.seen_version = version
+
+    def _matrix(self, res, slug):
+        roll = self.res[res]
+        if slug is None:
+            return roll, roll.rev.sum(axis=0), roll.cnt.sum(axis=0)
+        i = self.index.get(slug)
+        if i is None or i >= roll.rev.shape[0]:
+            return roll, np.zeros(roll.rev.shape[1], np.int64), np.zeros(roll.rev.shape[1], np.int32)
+        return roll, roll.rev[i], roll.cnt[i]
+
+    def series(self, slug=None, res="day", ma=7, last=None):
+        """revenue + sales per bucket (fleet-wide when slug is None) with a trailing MA"""
+        self.refresh()
+        roll, rev, cnt = self._matrix(res, slug)
+        avg = moving_average(rev, max(1, ma))
+        if last:
+            rev, cnt, avg = rev[-last:], cnt[-last:], avg[-last:]
+        start = ((roll.b0 or 0) + roll.rev.shape[1] - len(rev)) * roll.step
+        return {"slug": slug, "res": res, "start": start, "step": roll.step,
+                "revenue": rev.tolist(), "sales": cnt.tolist(),
+                "revenue_ma": np.round(avg, 2).tolist()}
+
+    def movers(self, res="day", window=7, n=10):
+        """slugs whose revenue over the last `window` buckets moved most vs the window before"""
+        self.refresh()
+        rev = self.res[res].rev
+        if not rev.size:
+            return []
+        c = np.cumsum(rev[:, ::-1], axis=1)    # cumulative from the newest bucket back
+        w = min(window, rev.shape[1])
+        cur = c[:, w - 1]
+        prev = c[:, min(2 * w, rev.shape[1]) - 1] - cur
+        delta = cur - prev
+        n = min(n, len(delta))
+        top = np.argpartition(-np.abs(delta), n - 1)[:n]
+        top = top[np.argsort(-np.abs(delta[top]))]
+        return [{"slug": self.slugs[i], "current": int(cur[i]), "previous": int(prev[i]),
+                 "delta": int(delta[i])} for i in top]
+
+def _check():
+    """regression: a future-dated bucket must survive later refreshes"""
+    from sales_store import SalesStore
+    store, now = SalesStore(":memory:"), time.time()
+    iso = lambda t: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+    r = RevenueRollups(store)
+    for i, (dt, price) in enumerate([(-2 * DAY, 100), (-HOUR, 67), (3 * DAY, 9), (0, 1)]):
+        store.ingest("demo", [{"id": i, "created_at": iso(now + dt), "price": price}])
+        r.refresh()
+    for name, roll in r.res.items():
+        assert int(roll.rev.sum()) == 177, (name, int(roll.rev.sum()))
+    print("✅ rollups keep every bucket")
+
+if __name__ == "__main__":
+    import argparse, sys
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--check", action="store_true", help="run the rollup regression check")
+    args = ap.parse_args()
+    if args.check:
+        _check()
+    else:
+        ap.print_help(sys.stderr)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+sales_store.py  –  local SQLite warehouse of Gumroad sales
+python sales_store.py --sync   # one incremental sync of every slug in forge_state.json
+
+Each product keeps a high-water mark (newest created_at seen); syncs only
+ask Gumroad for sales after it, page through next_page_key and insert
+each page in one transaction. /metrics then answers from indexed SQL.
+"""
+import asyncio, os, sqlite3, threading, time
+from pathlib import Path
+
+ROOT    = Path(__file__).parent
+DB_F    = Path(os.getenv("SALES_DB", ROOT / "sales.db"))
+STATE_F = ROOT / "forge_state.json"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sales (
+    id         TEXT PRIMARY KEY,
+    slug       TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    price      INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sales_slug_created ON sales (slug, created_at);
+CREATE TABLE IF NOT EXISTS sync_state (
+    slug       TEXT PRIMARY KEY,
+    high_water TEXT,
+    synced_at  REAL
+);
+"""
+
+def sale_price(s):
+    try:
+        return int(s["variants"][0]["price"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return int(s.get("price") or 0)
+
+class SalesStore:
+    # one shared connection: every statement runs under self._lock, and the
+    # async sync() hands the blocking parts to a worker thread
+    def __init__(self, path=DB_F):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.version = 0          # bumped whenever a sync lands new rows
+
+    # ---------- writes ----------
+    def high_water(self, slug):
+        with self._lock:
+            row = self.db.execute("SELECT high_water FROM sync_state WHERE slug=?", (slug,)).fetchone()
+        return row[0] if row else None
+
+    def ingest(self, slug, sales):
+        rows = [(str(s["id"]), slug, s.get("created_at") or "", sale_price(s)) for s in sales]
+        with self._lock:
+            self.db.execute("BEGIN")
+            try:
+                added = self.db.executemany("INSERT OR IGNORE INTO sales VALUES (?,?,?,?)", rows).rowcount
+                self.db.execute(
+                    "INSERT INTO sync_state (slug, high_water, synced_at) "
+                    "SELECT ?, MAX(created_at), ? FROM sales WHERE slug=? "
+                    "ON CONFLICT(slug) DO UPDATE SET high_water=excluded.high_water, "
+                    "synced_at=excluded.synced_at", (slug, time.time(), slug))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        if added:
+            self.version += 1
+        return added
+
+    async def sync(self, client, slug):
+        """incremental pull for one slug over an httpx.AsyncClient rooted at the v2 API"""
+        params = {}
+        hw = await asyncio.to_thread(self.high_water, slug)
+        if hw:
+            params["after"] = hw[:10]      # gumroad takes a date; overlap is dropped by the PK
+        added = 0
+        while True:
+            r = await client.get(f"/products/{slug}/sales", params=params)
+            r.raise_for_status()
+            body = r.json()
+            added += await asyncio.to_thread(self.ingest, slug, body.get("sales", []))
+            nxt = body.get("next_page_key")
+            if not nxt:
+                return added
+            params["page_key"] = nxt
+
+    # ---------- reads ----------
+    def summary(self, slugs):
+        q = ",".join("?" * len(slugs))
+        with self._lock:
+            rows = self.db.execute(
+                f"SELECT slug, COUNT(*), COALESCE(SUM(price), 0) FROM sales "
+                f"WHERE slug IN ({q}) GROUP BY slug", list(slugs)).fetchall() if slugs else []
+        got = {slug: (n, rev) for slug, n, rev in rows}
+        return [{"slug": s, "sales": got.get(s, (0, 0))[0], "revenue": got.get(s, (0, 0))[1]}
+                for s in slugs]
+
+    def totals(self):
+        """slug -> (sales, revenue) for the whole warehouse"""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT slug, COUNT(*), COALESCE(SUM(price), 0) FROM sales GROUP BY slug").fetchall()
+        return {slug: (n, rev) for slug, n, rev in rows}
+
+    def rows_since(self, rowid):
+        """(rowid, slug, epoch seconds, price) for sales inserted after `rowid`;
+        epoch is None when created_at doesn't parse"""
+        with self._lock:
+            return self.db.execute(
+                "SELECT rowid, slug, CAST(strftime('%s', created_at) AS INTEGER), price "
+                "FROM sales WHERE rowid > ? AND created_at != '' ORDER BY rowid", (rowid,)).fetchall()
+
+def sync_all(store, slugs, token=None):
+    import httpx
+    async def run():
+        async with httpx.AsyncClient(base_url="https://api.gumroad.com/v2", timeout=10,
+                                     headers={"Authorization": f"Bearer {token}"}) as c:
+            for slug in slugs:
+                try:
+                    print(f"🧾 {slug}: +{await store.sync(c, slug)}")
+                except Exception as e:
+                    print(f"⚠️ {slug}: {e}")
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    import argparse, sys
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sync", action="store_true")
+    args = ap.parse_args()
+    if args.sync:
+        from swarm_state import StateCache
+        sync_all(SalesStore(), StateCache(STATE_F).snapshot().slugs(), os.getenv("GUMROAD_TOKEN"))
+    else:
+        ap.print_help(sys.stderr)
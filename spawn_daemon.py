@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+spawn_daemon.py  –  long-lived spawner behind a local Unix socket
+python spawn_daemon.py            # serve on $SPAWN_SOCK (default ./spawn.sock)
+
+Imports, the pooled Gumroad client, the rate limiter and the dummy
+upload stay warm between requests, so a spawn costs only the upstream
+API time. Protocol: one JSON line in ({"count": N}), one JSON line out
+({"ok": true, "spawned": [...]} or {"ok": false, "error": "..."}).
+emergency_spawn.py is the thin client; it also runs spawn_batch()
+in-process when no daemon is listening.
+
+The socket is a local file, so the daemon has to run in the same
+container as commander.py (whose /make-one is the client), e.g.
+    python spawn_daemon.py & python commander.py
+A separate Procfile process type gets its own filesystem and every
+spawn would quietly take the cold fallback.
+"""
+import asyncio, datetime, json, logging, os, random, time, uuid
+from pathlib import Path
+import httpx
+from swarm_state import JOURNAL
+
+ROOT    = Path(__file__).parent
+SOCK    = Path(os.getenv("SPAWN_SOCK", ROOT / "spawn.sock"))
+TOKEN   = os.getenv("GUMROAD_TOKEN")
+GUM_API = "https://api.gumroad.com/v2"
+DUMMY   = ROOT / "dummy.pdf"
+MAX_COUNT = 100
+
+log = logging.getLogger("spawn_daemon")
+
+# ---------- pooled in-process client ----------
+class RateLimiter:
+    """spaces request starts at least 1/rate seconds apart"""
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next - now
+            self.next = max(now, self.next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def create_product(client, limiter, retries=4, upload=None):
+    slug  = f"ai-product-{uuid.uuid4().hex[:6]}"
+    title = f"AI Income Stream #{datetime.datetime.utcnow().strftime('%m%d')}"
+    price = 9
+    body  = "Fully automated passive-income asset generated while you sleep."
+    data  = {"name": title, "url": slug, "price": price, "description": body}
+    files = {"file": (DUMMY.name, upload, "application/pdf")} if upload else None
+
+    for attempt in range(retries + 1):
+        await limiter.wait()
+        try:
+            r = await client.post("/products", data=data, files=files)
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+            await asyncio.sleep(2 ** attempt + random.random())
+            continue
+        if (r.status_code == 429 or r.status_code >= 500) and attempt < retries:
+            wait = r.headers.get("Retry-After")
+            await asyncio.sleep(float(wait) if wait and wait.isdigit() else 2 ** attempt + random.random())
+            continue
+        r.raise_for_status()
+        return r.json()
+
+class Spawner:
+    """one warm client + limiter shared by every batch"""
+    def __init__(self, concurrency=4, rate=2.0):
+        if not TOKEN:
+            raise RuntimeError("Set GUMROAD_TOKEN")
+        self.limiter = RateLimiter(rate)
+        self.sem = asyncio.Semaphore(concurrency)
+        self.upload = DUMMY.read_bytes() if DUMMY.exists() else None
+        self.client = httpx.AsyncClient(base_url=GUM_API, timeout=30,
+                                        headers={"Authorization": f"Bearer {TOKEN}"},
+                                        limits=httpx.Limits(max_connections=concurrency))
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def _one(self):
+        async with self.sem:
+            return await create_product(self.client, self.limiter, upload=self.upload)
+
+    async def batch(self, count):
+        results = await asyncio.gather(*(self._one() for _ in range(count)), return_exceptions=True)
+        spawned = []
+        for res in results:
+            if isinstance(res, Exception):
+                log.warning(f"⚠️ spawn failed: {res}")
+                continue
+            slug = res["product"]["url"]
+            spawned.append({
+                "slug": slug,
+                "railway": f"https://{slug}.up.railway.app",
+                "gumroad": f"https://gum.co/{slug}"
+            })
+        JOURNAL.append(*spawned)                # one locked journal write for the whole batch
+        return spawned
+
+async def spawn_batch(count, concurrency=4, rate=2.0):
+    """cold, in-process path used when no daemon is running"""
+    sp = Spawner(concurrency, rate)
+    try:
+        return await sp.batch(count)
+    finally:
+        await sp.close()
+
+# ---------- socket server ----------
+async def handle(spawner, reader, writer):
+    try:
+        req = json.loads(await reader.readline() or b"{}")
+        count = max(1, min(int(req.get("count", 1)), MAX_COUNT))
+        spawned = await spawner.batch(count)
+        resp = {"ok": bool(spawned), "spawned": spawned}
+        if not spawned:
+            resp["error"] = "no products created"
+    except Exception as e:
+        resp = {"ok": False, "error": str(e)}
+    writer.write(json.dumps(resp).encode() + b"\n")
+    await writer.drain()
+    writer.close()
+
+async def serve(path=SOCK, concurrency=4, rate=2.0):
+    spawner = Spawner(concurrency, rate)
+    path.unlink(missing_ok=True)
+    server = await asyncio.start_unix_server(lambda r, w: handle(spawner, r, w), path=str(path))
+    os.chmod(path, 0o600)
+    log.info(f"spawn daemon listening on {path}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await spawner.close()
+        path.unlink(missing_ok=True)
+
+if __name__ == "__main__":
+    import argparse, swarm_log
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", "-c", type=int, default=4)
+    ap.add_argument("--rate", "-r", type=float, default=2.0, help="max requests/sec")
+    args = ap.parse_args()
+    swarm_log.setup(ROOT / "spawn_daemon.log", console=True)
+    asyncio.run(serve(SOCK, args.concurrency, args.rate))
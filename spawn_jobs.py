@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+spawn_jobs.py  –  bounded in-process job queue for spawns
+
+A fixed pool of worker threads drains a bounded queue. submit() never
+blocks: when the queue is full it raises QueueFull so the caller can
+answer 429. An idempotency key maps retries of the same request onto
+the job that is already queued, running or recently finished.
+"""
+import itertools, logging, queue, threading, time, uuid
+from collections import OrderedDict
+
+log = logging.getLogger("spawn_jobs")
+
+class QueueFull(Exception):
+    pass
+
+class JobQueue:
+    def __init__(self, fn, workers=2, maxsize=16, keep=1000):
+        self.fn = fn
+        self.keep = keep
+        self.q = queue.Queue(maxsize)
+        self.jobs = OrderedDict()     # id -> job dict, oldest first
+        self.keys = {}                # idempotency key -> id
+        self._lock = threading.Lock()
+        self._seq = itertools.count(1)
+        self.threads = [threading.Thread(target=self._work, name=f"spawn-{i}", daemon=True)
+                        for i in range(workers)]
+        for t in self.threads:
+            t.start()
+
+    def depth(self):
+        return self.q.qsize()
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def submit(self, key=None, **kwargs):
+        """-> (job, created); raises QueueFull"""
+        with self._lock:
+            if key and key in self.keys and self.keys[key] in self.jobs:
+                return dict(self.jobs[self.keys[key]]), False
+            job = {"id": f"{next(self._seq)}-{uuid.uuid4().hex[:8]}", "status": "queued",
+                   "key": key, "created": time.time(), "started": None, "finished": None,
+                   "result": None, "error": None}
+            try:
+                self.q.put_nowait((job, kwargs))
+            except queue.Full:
+                raise QueueFull(f"{self.q.maxsize} spawns already queued")
+            self.jobs[job["id"]] = job
+            if key:
+                self.keys[key] = job["id"]
+            self._trim()
+            return dict(job), True
+
+    def _trim(self):
+        while len(self.jobs) > self.keep:
+            oldest = next(iter(self.jobs.values()))
+            if oldest["status"] in ("queued", "running"):
+                return
+            self.jobs.popitem(last=False)
+            if oldest["key"]:
+                self.keys.pop(oldest["key"], None)
+
+    def _work(self):
+        while True:
+            job, kwargs = self.q.get()
+            job["status"], job["started"] = "running", time.time()
+            try:
+                job["result"] = self.fn(**kwargs)
+                job["status"] = "done"
+            except Exception as e:
+                job["status"], job["error"] = "failed", str(e)
+                log.error(f"spawn job {job['id']} failed: {e}")
+            finally:
+                job["finished"] = time.time()
+                self.q.task_done()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+supervisor.py  –  redeploy watchdog for unhealthy funnels
+
+Reads health from the commander's poller (it never probes on its own)
+and runs `railway up` for funnels that stay down, with per-slug
+exponential backoff and a circuit breaker that stops redeploying a
+funnel after repeated failures until a cooldown passes. Redeploys run
+on a small bounded pool. Only the holder of a SQLite lease supervises,
+so several commander workers/replicas sharing the volume run exactly
+one watchdog between them.
+"""
+import asyncio, logging, os, random, socket, sqlite3, subprocess, time, uuid
+from pathlib import Path
+from prometheus_client import Counter, Gauge
+
+ROOT = Path(__file__).parent
+log  = logging.getLogger("supervisor")
+
+REDEPLOYS = Counter("commander_redeploys_total", "railway up attempts", ["outcome"])
+OPEN      = Gauge("commander_circuits_open", "Funnels whose redeploy circuit is open")
+LEADER    = Gauge("commander_supervisor_leader", "1 while this process holds the watchdog lease")
+
+# ---------- lease ----------
+class Lease:
+    """single-row-per-name lease in SQLite; expired leases can be taken over"""
+    def __init__(self, path, name="watchdog", ttl=90):
+        self.name = name
+        self.ttl = ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self.db.execute("CREATE TABLE IF NOT EXISTS lease "
+                        "(name TEXT PRIMARY KEY, holder TEXT, expires REAL)")
+
+    def acquire(self):
+        """take or renew the lease; True while we hold it"""
+        now = time.time()
+        try:
+            self.db.execute(
+                "INSERT INTO lease VALUES (?,?,?) ON CONFLICT(name) DO UPDATE SET "
+                "holder=excluded.holder, expires=excluded.expires "
+                "WHERE lease.holder=excluded.holder OR lease.expires < ?",
+                (self.name, self.holder, now + self.ttl, now))
+            row = self.db.execute("SELECT holder FROM lease WHERE name=?", (self.name,)).fetchone()
+        except sqlite3.OperationalError as e:      # locked by another writer: not leader this tick
+            log.warning(f"lease check failed: {e}")
+            return False
+        return bool(row) and row[0] == self.holder
+
+    def release(self):
+        self.db.execute("DELETE FROM lease WHERE name=? AND holder=?", (self.name, self.holder))
+
+# ---------- supervisor ----------
+class Supervisor:
+    def __init__(self, health, slugs, lease, interval=30, concurrency=2,
+                 base=300, cap=6 * 3600, threshold=5, cooldown=24 * 3600, timeout=600):
+        self.health = health          # slug -> {"ok": bool, ...} or None
+        self.slugs = slugs            # () -> iterable of slugs
+        self.lease = lease
+        self.interval = interval
+        self.base, self.cap = base, cap
+        self.threshold, self.cooldown = threshold, cooldown
+        self.timeout = timeout
+        self.sem = asyncio.Semaphore(concurrency)
+        self.state = {}               # slug -> {"attempts", "next_at", "opened_at"}
+        self.inflight = set()
+
+    def _backoff(self, attempts):
+        return min(self.cap, self.base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+    def _due(self, slug, now):
+        st = self.state.get(slug)
+        if st is None:
+            return True
+        if st["opened_at"] and now < st["opened_at"] + self.cooldown:
+            return False              # open circuit; half-open once the cooldown passes
+        return now >= st["next_at"]
+
+    def _redeploy(self, slug):
+        subprocess.run("railway up", shell=True, cwd=ROOT / "swarm" / slug,
+                       capture_output=True, check=True, timeout=self.timeout)
+
+    async def _attempt(self, slug):
+        async with self.sem:
+            log.info(f"redeploy swarm/{slug}")
+            try:
+                await asyncio.to_thread(self._redeploy, slug)
+                outcome = "ok"
+            except Exception as e:
+                outcome = "failed"
+                log.error(f"redeploy fail {slug}: {e}")
+        REDEPLOYS.labels(outcome).inc()
+        now = time.time()
+        st = self.state.setdefault(slug, {"attempts": 0, "next_at": 0, "opened_at": None})
+        st["attempts"] += 1          # counts until the funnel is seen healthy again
+        st["next_at"] = now + self._backoff(st["attempts"])
+        if st["attempts"] >= self.threshold:
+            if not st["opened_at"] or now >= st["opened_at"] + self.cooldown:
+                log.warning(f"circuit open for {slug} after {st['attempts']} redeploys")
+            st["opened_at"] = now
+        self.inflight.discard(slug)
+
+    def tick(self):
+        now = time.time()
+        live = set(self.slugs())
+        for slug in list(self.state):
+            h = self.health(slug)
+            if slug not in live or (h and h["ok"]):
+                if slug in live:
+                    log.info(f"{slug} healthy again, circuit closed")
+                self.state.pop(slug)
+        for slug in live:
+            h = self.health(slug)
+            if h is None or h["ok"] or slug in self.inflight or not self._due(slug, now):
+                continue
+            self.inflight.add(slug)
+            asyncio.create_task(self._attempt(slug))
+        OPEN.set(sum(1 for st in self.state.values()
+                     if st["opened_at"] and now < st["opened_at"] + self.cooldown))
+
+    async def run(self):
+        try:
+            while True:
+                leader = await asyncio.to_thread(self.lease.acquire)
+                LEADER.set(int(leader))
+                if leader:
+                    self.tick()
+                await asyncio.sleep(self.interval)
+        finally:
+            await asyncio.to_thread(self.lease.release)
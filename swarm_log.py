@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+swarm_log.py  –  shared non-blocking logging for commander + forge
+
+Callers only enqueue (QueueHandler); one QueueListener thread formats
+JSON lines and does the disk writes, so a slow disk never stalls a
+request. Files roll over by size or age, whichever comes first, and
+rolled files are gzipped. setup() is idempotent: calling it again (or
+importing a module twice, as `python commander.py` does) never stacks
+a second handler, which is what produced the duplicated lines.
+"""
+import atexit, gzip, json, logging, os, queue, shutil, time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+MAX_BYTES   = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+MAX_AGE     = float(os.getenv("LOG_ROTATE_SECONDS", 24 * 3600))
+BACKUPS     = int(os.getenv("LOG_BACKUPS", 7))
+QUIET       = ("httpx", "httpcore")       # per-request INFO chatter from the pollers
+
+_listeners = {}                           # resolved path -> (QueueHandler, QueueListener)
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {"ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                     + f".{int(record.msecs):03d}Z",
+               "level": record.levelname, "logger": record.name, "msg": record.getMessage()}
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        for k in ("slug", "job", "route", "ms"):
+            if hasattr(record, k):
+                out[k] = getattr(record, k)
+        return json.dumps(out, ensure_ascii=False)
+
+class SizeTimeRotatingHandler(RotatingFileHandler):
+    """numbered rollover (.1.gz, .2.gz, …) on size or on age"""
+    def __init__(self, filename, max_bytes=MAX_BYTES, max_age=MAX_AGE, backups=BACKUPS):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backups,
+                         encoding="utf-8", delay=True)
+        self.max_age = max_age
+        self.rollover_at = time.time() + max_age
+        self.namer = lambda name: name + ".gz"
+        self.rotator = _gzip_rotate
+
+    def shouldRollover(self, record):
+        if (self.max_age and time.time() >= self.rollover_at
+                and os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename)):
+            return True
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = time.time() + self.max_age
+
+def _gzip_rotate(source, dest):
+    with open(source, "rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+def setup(path, level=logging.INFO, console=False):
+    """route the root logger through a background writer for `path`"""
+    key = os.path.abspath(path)
+    root = logging.getLogger()
+    if key in _listeners:
+        return root
+    for h in list(root.handlers):         # drop basicConfig / stale handlers on the same file
+        if isinstance(h, QueueHandler) or getattr(h, "baseFilename", None) == key:
+            root.removeHandler(h)
+
+    sinks = [SizeTimeRotatingHandler(key)]
+    sinks[0].setFormatter(JsonFormatter())
+    if console:
+        sh = logging.StreamHandler()
+        sh.setFormatter(logging.Formatter("%(message)s"))
+        sinks.append(sh)
+
+    q = queue.SimpleQueue()
+    qh = QueueHandler(q)
+    listener = QueueListener(q, *sinks, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    _listeners[key] = (qh, listener)
+
+    root.addHandler(qh)
+    root.setLevel(level)
+    for name in QUIET:
+        logging.getLogger(name).setLevel(logging.WARNING)
+    return root
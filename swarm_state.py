@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+swarm_state.py  –  shared read + write side of the swarm state
+python swarm_state.py --compact   # fold the journal into forge_state.json now
+
+Writes never rewrite the whole fleet: they append one JSON line per
+change to forge_state.journal.jsonl under an exclusive file lock, and
+once the journal passes STATE_COMPACT_BYTES it is folded into the
+forge_state.json snapshot (tmp file + os.replace) and truncated, still
+under the lock. Journal ops are upserts keyed by slug, so replaying a
+line twice is harmless.
+
+StateCache.snapshot() costs two stat() calls when nothing changed. When
+only the journal grew it reads just the new bytes; anything else
+(compaction, hand edits) triggers a full reload under a shared lock.
+Snapshots are immutable (tuple of read-only mappings) so they can be
+handed to any number of threads, and carry a slug index for O(1) lookups.
+"""
+import json, logging, os, threading
+from pathlib import Path
+from types import MappingProxyType
+
+try:
+    import fcntl
+except ImportError:       # windows
+    fcntl = None
+    import msvcrt
+
+ROOT      = Path(__file__).parent
+STATE_F   = ROOT / "forge_state.json"
+COMPACT_BYTES = int(os.getenv("STATE_COMPACT_BYTES", 256 * 1024))
+
+log = logging.getLogger("swarm_state")
+
+def journal_path(state_f):
+    return Path(state_f).with_name(Path(state_f).stem + ".journal.jsonl")
+
+def _stat(path):
+    try:
+        st = path.stat()
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return None
+
+# ---------- locking ----------
+class FileLock:
+    def __init__(self, path, shared=False):
+        self.path = Path(path)
+        self.shared = shared
+
+    def __enter__(self):
+        self.f = open(self.path, "a+b")
+        if fcntl:
+            fcntl.flock(self.f, fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX)
+        else:                 # msvcrt has no shared mode; readers take it exclusively
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.f, fcntl.LOCK_UN)
+        else:
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        self.f.close()
+
+# ---------- journal ----------
+def apply(by_slug, data):
+    """apply complete journal lines in `data` to a slug -> entry dict; -> bytes consumed"""
+    end = data.rfind(b"\n") + 1           # a torn last line is left for the next read
+    for line in data[:end].splitlines():
+        try:
+            op = json.loads(line)
+        except ValueError:
+            log.error(f"skipping bad journal line: {line[:80]!r}")
+            continue
+        if op.get("op") == "del":
+            by_slug.pop(op["slug"], None)
+        else:
+            e = op["entry"]
+            by_slug[e["slug"]] = e
+    return end
+
+class Journal:
+    def __init__(self, state_f=STATE_F, compact_bytes=COMPACT_BYTES):
+        self.state_f = Path(state_f)
+        self.journal_f = journal_path(self.state_f)
+        self.lock_f = self.state_f.with_name(self.state_f.name + ".lock")
+        self.compact_bytes = compact_bytes
+
+    def _write(self, ops):
+        data = "".join(json.dumps(op, ensure_ascii=False) + "\n" for op in ops).encode()
+        with FileLock(self.lock_f):
+            with open(self.journal_f, "ab") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if self.compact_bytes and size >= self.compact_bytes:
+                self._compact()
+
+    def append(self, *entries):
+        """upsert swarm entries (O(1): one appended line each)"""
+        if entries:
+            self._write({"op": "put", "entry": e} for e in entries)
+
+    def remove(self, *slugs):
+        if slugs:
+            self._write({"op": "del", "slug": s} for s in slugs)
+
+    def _load(self):
+        by_slug = {}
+        if self.state_f.exists():
+            for e in json.loads(self.state_f.read_text()).get("swarm", []):
+                by_slug[e["slug"]] = e
+        if self.journal_f.exists():
+            apply(by_slug, self.journal_f.read_bytes())
+        return by_slug
+
+    def _compact(self):
+        swarm = list(self._load().values())
+        tmp = self.state_f.with_name(self.state_f.name + ".tmp")
+        tmp.write_text(json.dumps({"swarm": swarm}, indent=2))
+        os.replace(tmp, self.state_f)
+        open(self.journal_f, "wb").close()
+        log.info(f"compacted swarm state: {len(swarm)} funnels")
+
+    def compact(self):
+        with FileLock(self.lock_f):
+            self._compact()
+
+    def read(self):
+        """consistent (swarm list, snapshot stat, journal stat) under a shared lock"""
+        with FileLock(self.lock_f, shared=True):
+            return list(self._load().values()), _stat(self.state_f), _stat(self.journal_f)
+
+# ---------- read side ----------
+class Snapshot:
+    __slots__ = ("swarm", "by_slug", "sig")
+
+    def __init__(self, swarm=(), sig=None):
+        self.swarm = tuple(MappingProxyType(dict(s)) for s in swarm)
+        self.by_slug = MappingProxyType({s["slug"]: s for s in self.swarm})
+        self.sig = sig
+
+    def get(self, slug):
+        return self.by_slug.get(slug)
+
+    def slugs(self):
+        return list(self.by_slug)
+
+    def __len__(self):
+        return len(self.swarm)
+
+    def __iter__(self):
+        return iter(self.swarm)
+
+class StateCache:
+    def __init__(self, path=STATE_F):
+        self.path = Path(path)
+        self.journal = Journal(self.path)
+        self.reloads = 0
+        self._snap = Snapshot(sig=(None, None))
+        self._jpos = 0            # journal bytes already folded into _snap
+        self._lock = threading.Lock()
+
+    def _sig(self):
+        return (_stat(self.path), _stat(self.journal.journal_f))
+
+    def snapshot(self):
+        sig = self._sig()
+        if sig == self._snap.sig:
+            return self._snap
+        with self._lock:
+            if sig == self._snap.sig:
+                return self._snap
+            old_s, old_j = self._snap.sig
+            new_s, new_j = sig
+            try:
+                if (new_s == old_s and old_j and new_j and new_j[0] == old_j[0]
+                        and new_j[2] >= self._jpos):
+                    self._tail(sig)                 # journal only grew
+                else:
+                    swarm, s_sig, j_sig = self.journal.read()
+                    self._snap = Snapshot(swarm, (s_sig, j_sig))
+                    self._jpos = j_sig[2] if j_sig else 0
+            except Exception as e:
+                log.error(f"malformed json: {e}")     # keep serving the last good swarm
+                self._snap = Snapshot(self._snap.swarm, sig)
+            self.reloads += 1
+            return self._snap
+
+    def _tail(self, sig):
+        with open(self.journal.journal_f, "rb") as f:
+            f.seek(self._jpos)
+            data = f.read()
+        by_slug = dict(self._snap.by_slug)
+        used = apply(by_slug, data)
+        self._jpos += used
+        # a torn trailing line keeps the old journal sig so the next call retries it
+        jsig = sig[1] if used == len(data) else self._snap.sig[1]
+        self._snap = Snapshot(by_slug.values(), (sig[0], jsig))
+
+STATE   = StateCache()
+JOURNAL = STATE.journal
+
+if __name__ == "__main__":
+    import argparse, sys
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--compact", action="store_true")
+    args = ap.parse_args()
+    if args.compact:
+        JOURNAL.compact()
+        print(f"✅ compacted {len(STATE.snapshot())} funnels into {STATE_F.name}")
+    else:
+        ap.print_help(sys.stderr)